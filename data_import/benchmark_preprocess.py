@@ -0,0 +1,64 @@
+import re
+import sys
+import time
+import random
+import pandas as pd
+from importing_scripts.preprocessing import preprocess_text, preprocess_text_parallel
+
+# compares the throughput of the text preprocessing of the import with the previous per-row implementation
+# on synthetic posts, usage: python benchmark_preprocess.py [rows]
+
+def legacy_preprocess_text(platform, df):
+    # preprocess_text before precompiled patterns and vectorized string operations, kept as baseline
+    try:
+        if platform == "twitter":
+            df["text_prep"] = df["text"].apply(lambda sub: re.sub(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})", "", sub)).apply(lambda sub: re.sub(r"(^|[^@\w])@(\w{1,15})\b", "", sub)).apply(lambda x: x.strip())
+        elif platform == "4chan":
+            df["text_prep"] = df["text.x"].apply(lambda sub: re.sub(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})", "", str(sub).replace(">","").replace("&gt;","")))
+        elif platform == "legacy":
+            def preprocess_text(sub):
+                return re.sub(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})", "", str(sub))
+            df['text_prep'] = df.apply(lambda row: preprocess_text(row['Text']) if 'ArticleID' in row and (not pd.isna(row['ArticleID'])) else preprocess_text(row['textonly']), axis=1)
+        elif platform == "reddit":
+            def preprocess_text(sub):
+                return re.sub(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})", "", str(sub).replace(">","").replace("&gt;",""))
+            df["text_prep"] = df.apply(lambda row: preprocess_text(row['selftext']) if row.type == "RS" else preprocess_text(row['body']), axis=1)
+        else:
+            df["text_prep"] = df["text"]
+    except:
+        df["text_prep"] = df["text"]
+    return df
+
+WORDS = ["the", "news", "people", "government", "truth", "media", "today", "vaccine", "Berlin", "world", "&gt;", ">>123456",
+         "@user_1", "https://www.example.com/article?id=42", "www.example.org/path", "http://t.co/AbC123"]
+
+def random_texts(rows, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 60))) for _ in range(rows)]
+
+def synthetic_frame(platform, rows):
+    texts = random_texts(rows)
+    if platform == "twitter":
+        return pd.DataFrame({"text": texts})
+    if platform == "4chan":
+        return pd.DataFrame({"text.x": texts})
+    if platform == "legacy":
+        article_ids = [float(i) if i % 5 == 0 else float("nan") for i in range(rows)]
+        return pd.DataFrame({"textonly": texts, "Text": texts[::-1], "ArticleID": article_ids})
+    return pd.DataFrame({"type": ["RS" if i % 3 == 0 else "RC" for i in range(rows)], "selftext": texts, "body": texts[::-1]})
+
+def measure(function, platform, df):
+    start = time.perf_counter()
+    result = function(platform, df.copy())
+    return result, len(df) / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    print(f"{'platform':<10} {'legacy rows/s':>15} {'vectorized rows/s':>18} {'parallel rows/s':>16} {'speedup':>8} {'same output':>12}")
+    for platform in ["twitter", "4chan", "legacy", "reddit"]:
+        df = synthetic_frame(platform, rows)
+        legacy_result, legacy_rate = measure(legacy_preprocess_text, platform, df)
+        vectorized_result, vectorized_rate = measure(preprocess_text, platform, df)
+        parallel_result, parallel_rate = measure(preprocess_text_parallel, platform, df)
+        same_output = legacy_result["text_prep"].equals(vectorized_result["text_prep"]) and legacy_result["text_prep"].equals(parallel_result["text_prep"])
+        print(f"{platform:<10} {legacy_rate:>15,.0f} {vectorized_rate:>18,.0f} {parallel_rate:>16,.0f} {vectorized_rate / legacy_rate:>7.1f}x {str(same_output):>12}")
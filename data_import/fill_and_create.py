@@ -4,7 +4,7 @@ import traceback
 import csv
 import psycopg2 as pg
 from importing_scripts.table_setup import *
-from importing_scripts.table_populate import fill_altnews, fill_legnews, fill_consp_label, fill_liwc_label, fill_4chan, fill_reddit, fill_twitter, fill_liwc_tweets, fill_tweets
+from importing_scripts.table_populate import fill_altnews, fill_legnews, fill_4chan, fill_reddit, fill_twitter
 
 csv.field_size_limit(sys.maxsize)
 
@@ -25,6 +25,10 @@ print("Setting up tables...")
 # create_tables(cursor, connection)
 print("Successfully set up tables!")
 
+# secondary indexes are rebuilt after the bulk load instead of being maintained row by row
+print("Dropping secondary indexes...")
+drop_indexes(cursor, connection)
+
 
 # add data
 try:
@@ -58,11 +62,14 @@ except Exception as e:
 
 try:
     print("(5) Populating tweet tables...")
-    fill_twiter(cursor, connection)
+    fill_twitter(cursor, connection)
     print("Successfully pupulated Twitter tables!")
 except Exception as e:
     print(f"Error during Population of Twitter tables: {e}")
 
+print("(6) Rebuilding secondary indexes...")
+create_indexes(cursor, connection)
+
 
 connection.close()
 cursor.close()
@@ -0,0 +1,38 @@
+from decouple import Config, RepositoryEnv
+import os
+import sys
+import csv
+import psycopg2 as pg
+from importing_scripts.table_setup import *
+from importing_scripts.parallel_import import fill_parallel
+
+csv.field_size_limit(sys.maxsize)
+
+
+config = Config(RepositoryEnv('./../.env'))
+HOST = config.get('REMOTE_HOST')
+UNAME = config.get('UNAME')
+PW = config.get('PASSWORD')
+DB_NAME = config.get('DB_NAME')
+WORKERS = config.get('IMPORT_WORKERS', default=os.cpu_count(), cast=int)
+
+conn_dat = {'host': HOST, 'port': 5432, 'dbname': DB_NAME, 'user': UNAME, 'password': PW}
+
+if __name__ == "__main__":
+    # open connection and starting cursor to execute commands
+    connection = pg.connect(**conn_dat)
+    cursor = connection.cursor()
+
+    # secondary indexes are rebuilt after the bulk load instead of being maintained row by row
+    print("Dropping secondary indexes...")
+    drop_indexes(cursor, connection)
+
+    print(f"(1) Populating all tables with {WORKERS} workers...")
+    fill_parallel(conn_dat, workers=WORKERS)
+    print("Successfully populated all tables!")
+
+    print("(2) Rebuilding secondary indexes...")
+    create_indexes(cursor, connection)
+
+    cursor.close()
+    connection.close()
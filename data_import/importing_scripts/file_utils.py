@@ -4,7 +4,11 @@ import pandas as pd
 import pickle
 import os
 import re
-from json import load as jload
+from json import load as jload, dumps as jdumps
+import shutil
+
+# suffix of the log files written by this process, parallel imports give each worker its own files (see merge_logs)
+LOG_SUFFIX = ""
 
 def get_extension(filepath):
     ext = filepath.split(".")[-1]
@@ -77,6 +81,25 @@ def clean_table_cols(df, check_string=True):
             df.rename(columns={col: new_column_name}, inplace=True)
     return df
 
+def set_log_suffix(suffix):
+    global LOG_SUFFIX
+    LOG_SUFFIX = suffix
+
+def merge_logs(log_dir="./logs"):
+    # append the log files of worker processes (<name>.<pid>.log/.jsonl) to the log files of their name and remove them
+    for path in sorted(glob(f"{log_dir}/*.*")):
+        match = re.match(r"(.*)\.(\d+)\.(log|jsonl)$", path)
+        if match:
+            with open(f"{match.group(1)}.{match.group(3)}", "a") as merged_file, open(path) as worker_file:
+                shutil.copyfileobj(worker_file, merged_file)
+            os.remove(path)
+
 def add_to_log(logname, log_mgs):
-    with open(f"./logs/{logname}.log", "a") as log_file:
+    with open(f"./logs/{logname}{LOG_SUFFIX}.log", "a") as log_file:
         log_file.write(log_mgs)
+
+
+def add_to_rejects(logname, row, reason):
+    # quarantine a row which could not be imported, one JSON object with the reason and the row values per line
+    with open(f"./logs/{logname}_rejects{LOG_SUFFIX}.jsonl", "a") as reject_file:
+        reject_file.write(jdumps({"reason": reason, "row": row}, default=str) + "\n")
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+import psycopg2 as pg
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+from importing_scripts.file_utils import add_to_log, set_log_suffix, merge_logs
+from importing_scripts import table_populate
+from importing_scripts.table_populate import FILE_IMPORTS, fill_twitter_users, fill_liwc_tweets, fill_author_index
+from importing_scripts.table_setup import refresh_rollup_tables
+
+# connection, cursor and LIWC labels of a worker process
+worker_state = {}
+
+def connect_worker(conn_dat):
+    connection = pg.connect(**conn_dat)
+    worker_state['conn_dat'] = conn_dat
+    worker_state['connection'] = connection
+    worker_state['cursor'] = connection.cursor()
+
+def init_worker(conn_dat):
+    connect_worker(conn_dat)
+    worker_state['liwc'] = {}
+    set_log_suffix(f".{os.getpid()}")
+    # the files are already spread over the worker processes, so each one preprocesses its chunks itself
+    table_populate.PREPROCESS_WORKERS = 1
+
+def import_file(platform, filepath):
+    # a connection lost during an earlier file is opened again
+    if worker_state['connection'].closed:
+        connect_worker(worker_state['conn_dat'])
+    _, load_liwc, fill_file = FILE_IMPORTS[platform]
+    # the LIWC labels of a platform are loaded once per worker and shared by all its files
+    if platform not in worker_state['liwc']:
+        worker_state['liwc'][platform] = load_liwc()
+    fill_file(worker_state['cursor'], worker_state['connection'], filepath, worker_state['liwc'][platform])
+
+def fill_parallel(conn_dat, workers=None, platforms=None):
+    # Import the files of all platforms on a pool of worker processes with one database connection each:
+    # (1) twitter users, which tweets refer to, (2) all files in parallel, largest first, (3) the sampled LIWC tweets,
+    # (4) the author index and (5) the rollup tables. Errors are logged per worker and the logs are merged at the end
+    platforms = platforms or list(FILE_IMPORTS)
+    connection = pg.connect(**conn_dat)
+    cursor = connection.cursor()
+    try:
+        if "twitter" in platforms:
+            print("Populating twitter users...")
+            fill_twitter_users(cursor, connection)
+
+        tasks = [(platform, filepath) for platform in platforms for filepath in FILE_IMPORTS[platform][0]()]
+        tasks.sort(key=lambda task: os.path.getsize(task[1]), reverse=True)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(conn_dat,)) as executor:
+            futures = {executor.submit(import_file, platform, filepath): (platform, filepath) for platform, filepath in tasks}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Importing files"):
+                platform, filepath = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error importing {filepath}: {e}")
+                    add_to_log(platform, f"Error importing {filepath}: {e}\n")
+
+        if "twitter" in platforms:
+            print("Populating sampled tweets...")
+            fill_liwc_tweets(cursor, connection)
+
+        for platform in platforms:
+            fill_author_index(cursor, connection, platform)
+        refresh_rollup_tables(cursor, connection)
+    finally:
+        merge_logs()
+        cursor.close()
+        connection.close()
@@ -0,0 +1,93 @@
+import re
+import os
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# links (with or without protocol) and twitter mentions removed from the texts, compiled once instead of per post
+URL_PATTERN = re.compile(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})")
+# mentions start at the '@', so that re searches for it instead of trying the pattern at every character; the character
+# before the mention (neither '@' nor a word character) is removed with it, as by the legacy pattern (^|[^@\w])@(\w{1,15})\b
+MENTION_PATTERN = re.compile(r"@(?<![@\w]@)\w{1,15}\b")
+
+# columns read by preprocess_text per platform, only these are sent to worker processes
+PREPROCESS_COLUMNS = {
+    "twitter": ["text"],
+    "4chan": ["text.x"],
+    "legacy": ["textonly", "Text", "ArticleID"],
+    "reddit": ["type", "selftext", "body"]
+}
+
+def strip_urls(text):
+    # all links start with 'http' or 'www.', texts without them are not searched
+    if "http" not in text and "www." not in text:
+        return text
+    return URL_PATTERN.sub("", text)
+
+def strip_mentions(text):
+    parts = []
+    end = 0
+    for match in MENTION_PATTERN.finditer(text):
+        parts.append(text[end:max(match.start() - 1, 0)])
+        end = match.end()
+    if not parts:
+        return text
+    parts.append(text[end:])
+    return "".join(parts)
+
+def strip_quote_marks(text):
+    # 4chan and reddit quotes start with '>' (html escaped as '&gt;')
+    return text.replace(">", "").replace("&gt;", "")
+
+def prep_tweet(text):
+    return strip_mentions(strip_urls(text)).strip()
+
+def prep_quoted_text(text):
+    return strip_urls(strip_quote_marks(text))
+
+def map_texts(function, texts):
+    # apply a text function to all string values in one pass, other values become NaN like with the .str accessor
+    return pd.Series([function(text) if isinstance(text, str) else float("nan") for text in texts], index=texts.index, dtype=object)
+
+def preprocess_text(platform, df):
+    try:
+        if platform == "twitter":
+            df["text_prep"] = map_texts(prep_tweet, df["text"])
+        elif platform == "4chan":
+            df["text_prep"] = map_texts(prep_quoted_text, df["text.x"].astype(str))
+        elif platform == "legacy":
+            # FAZ articles (with an ArticleID) hold their text in 'Text', all other legacy media in 'textonly'
+            texts = df["textonly"] if "textonly" in df.columns else pd.Series(float("nan"), index=df.index, dtype=object)
+            if "ArticleID" in df.columns:
+                texts = df["Text"].where(df["ArticleID"].notna(), texts)
+            df["text_prep"] = map_texts(strip_urls, texts.astype(str))
+        elif platform == "reddit":
+            # submissions (RS) hold their text in 'selftext', comments in 'body'
+            texts = df["selftext"].where(df["type"] == "RS", df["body"])
+            df["text_prep"] = map_texts(prep_quoted_text, texts.astype(str))
+        else:
+            df["text_prep"] = df["text"]
+    except:
+        df["text_prep"] = df["text"]
+    return df
+
+# worker processes of preprocess_text_parallel, kept between chunks
+preprocess_executor = {}
+
+def preprocess_text_parallel(platform, df, workers=None, min_rows=1000):
+    # preprocess_text on one slice of the chunk per worker process, for chunks of many long texts; chunks of less
+    # than two slices of min_rows rows and platforms whose texts are not preprocessed stay in this process
+    workers = workers or os.cpu_count()
+    slice_rows = max(-(-len(df) // workers), min_rows)
+    if workers <= 1 or platform not in PREPROCESS_COLUMNS or len(df) <= slice_rows:
+        return preprocess_text(platform, df)
+
+    columns = [column for column in PREPROCESS_COLUMNS[platform] if column in df.columns]
+    slices = [df[columns].iloc[start:start + slice_rows] for start in range(0, len(df), slice_rows)]
+    if preprocess_executor.get('workers') != workers:
+        if 'executor' in preprocess_executor:
+            preprocess_executor['executor'].shutdown()
+        preprocess_executor['executor'] = ProcessPoolExecutor(max_workers=workers)
+        preprocess_executor['workers'] = workers
+    prepped_slices = list(preprocess_executor['executor'].map(preprocess_text, [platform] * len(slices), slices))
+    df["text_prep"] = pd.concat([prepped["text_prep"] for prepped in prepped_slices])
+    return df
@@ -1,356 +1,454 @@
 import re
 import csv
-import sys, traceback
+import io
+import sys
 import pandas as pd
 import datetime
 import pytz
 from tqdm import tqdm
 from langdetect import detect
 from decouple import Config, RepositoryEnv
-from importing_scripts.file_utils import get_valid_filepaths, get_df, add_to_log, get_encoding, clean_table_cols
+from importing_scripts.file_utils import get_valid_filepaths, get_df, add_to_log, add_to_rejects, get_encoding, clean_table_cols
+from importing_scripts.preprocessing import preprocess_text, preprocess_text_parallel
+from importing_scripts.table_setup import refresh_rollup_tables, AUTHOR_INDEX_SOURCES
 
 config = Config(RepositoryEnv('./../.env'))
 BASE_PATH = config.get('BASE_PATH')
+# worker processes preprocessing the texts of each chunk, 1 preprocesses them in the importing process
+PREPROCESS_WORKERS = config.get('PREPROCESS_WORKERS', default=1, cast=int)
 
 csv.field_size_limit(sys.maxsize)
 
-def preprocess_text(platform, df):
-    try:
-        if platform == "twitter":
-            df["text_prep"] = df["text"].apply(lambda sub: re.sub(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})", "", sub)).apply(lambda sub: re.sub(r"(^|[^@\w])@(\w{1,15})\b", "", sub)).apply(lambda x: x.strip())
-        elif platform == "4chan":
-            df["text_prep"] = df["text.x"].apply(lambda sub: re.sub(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})", "", str(sub).replace(">","").replace("&gt;","")))
-        elif platform == "legacy":
-            def preprocess_text(sub):
-                return re.sub(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})", "", str(sub))
-            df['text_prep'] = df.apply(lambda row: preprocess_text(row['Text']) if 'ArticleID' in row and (not pd.isna(row['ArticleID'])) else preprocess_text(row['textonly']), axis=1)
-        elif platform == "reddit":
-            def preprocess_text(sub):
-                return re.sub(r"(https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.[^\s]{2,}|https?:\/\/(?:www\.|(?!www))[a-zA-Z0-9]+\.[^\s]{2,}|www\.[a-zA-Z0-9]+\.[^\s]{2,})", "", str(sub).replace(">","").replace("&gt;",""))
-            df["text_prep"] = df.apply(lambda row: preprocess_text(row['selftext']) if row.type == "RS" else preprocess_text(row['body']), axis=1)
-        else:
-            df["text_prep"] = df["text"]
-    except:
-        df["text_prep"] = df["text"]
-    return df
+CONTENT_COLUMNS = ["date", "timestamp", "text", "title", "text_prep", "platform", "subplatform", "language", "content_id", "label_liwc", "label_consp"]
+LIWC_COLUMNS = ["BigWords", "Segment", "WC", "allnone", "cause", "certitude", "cogproc", "differ", "discrep", "emo_anger", "emo_anx", 
+                "emo_neg", "emo_pos", "emo_sad", "emotion", "insight", "prep", "tentat"]
+
+# SQLSTATE classes of errors caused by the values of a post (data exception, integrity constraint violation),
+# only posts failing with these are rejected; any other error aborts the chunk
+REJECT_ERROR_CLASSES = ("22", "23")
+# SQLSTATEs of transient errors (serialization failure, deadlock) after which a chunk is loaded again
+RETRY_ERROR_CODES = ("40001", "40P01")
+CHUNK_ATTEMPTS = 3
+
+def copy_value(value):
+    # value in the COPY text format, NaN and None are NULL and integral floats (pandas columns with NaN) are written as integers
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return "\\N"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def copy_rows(cursor, table, columns, rows):
+    # stream rows into a table with COPY FROM STDIN instead of one INSERT per row
+    if not rows:
+        return
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+def reserve_ids(cursor, table, n, column="id"):
+    # take n values of the serial sequence of a table at once, so that ids are known before the rows are copied
+    if n == 0:
+        return []
+    cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s);", (table, column, n))
+    return [row[0] for row in cursor.fetchall()]
+
+def stage_rows(cursor, table, columns, rows):
+    # copy rows into an empty temporary table shaped like the target table, from which they are inserted with ON CONFLICT
+    stage_table = f"stage_{table}"
+    cursor.execute(f"""
+    CREATE TEMP TABLE IF NOT EXISTS {stage_table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+    TRUNCATE {stage_table};
+    """)
+    copy_rows(cursor, stage_table, columns, rows)
+    return stage_table
+
+def copy_platform_rows(cursor, table, columns, rows):
+    # insert rows into a platform table and return their ids aligned with the rows, None for rows already in the table
+    ids = reserve_ids(cursor, table, len(rows))
+    if not ids:
+        return []
+    stage_table = stage_rows(cursor, table, ["id"] + columns, [(row_id,) + tuple(row) for row_id, row in zip(ids, rows)])
+    cursor.execute(f"""
+    INSERT INTO {table} (id, {', '.join(columns)})
+    SELECT id, {', '.join(columns)} FROM {stage_table}
+    ON CONFLICT DO NOTHING
+    RETURNING id;
+    """)
+    inserted = {row[0] for row in cursor.fetchall()}
+    return [row_id if row_id in inserted else None for row_id in ids]
 
 def fill_content(input_data, cursor):
-    cursor.executemany("""
-        INSERT INTO content (date, timestamp, text, title, text_prep, platform, subplatform, language, content_id, label_liwc, label_consp)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-    """, input_data)
-
-def fill_consp_label(cursor, connection, row):
-    label_consp_id = None
-    cursor.execute("""
-    INSERT INTO labels_consp (V1_bin, V1_prob, V2_GR_bin, V2_GR_prob, V2_NWO_bin, V2_NWO_prob)
-    VALUES (%s, %s, %s, %s, %s, %s)
-    RETURNING id;
-    """,
-    (bool(row['label_pred']), row['label_pred_probability'],
-    bool(row['label_GR']), row['label_GR_probability'],
-    bool(row['v2_NWO']), row['label_NWO_probability']))
-    label_consp_id = cursor.fetchone()[0]
-    connection.commit()
-
-    return label_consp_id
-
-def fill_liwc_label(cursor, connection, row):
-    label_liwc_id = None
-    if pd.notna(row['Segment']):
-        cursor.execute("""
-        INSERT INTO labels_liwc (BigWords, Segment, WC, allnone, cause, certitude, cogproc, differ, discrep, emo_anger, emo_anx, emo_neg, emo_pos, emo_sad, emotion, insight, prep, tentat)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id;
-        """,
-        (row['BigWords'], row['Segment'], row['WC'], row['allnone'], row['cause'], row['certitude'],
-        row['cogproc'], row['differ'], row['discrep'], row['emo_anger'], row['emo_anx'], row['emo_neg'],
-        row['emo_pos'], row['emo_sad'], row['emotion'], row['insight'], row['prep'], row['tentat']))
-        label_liwc_id = cursor.fetchone()[0]
+    copy_rows(cursor, "content", CONTENT_COLUMNS, input_data)
+
+def copy_frame(cursor, table, df):
+    # stream a DataFrame into the table columns of the same names with one COPY in csv format
+    buffer = io.StringIO()
+    df.to_csv(buffer, header=False, index=False, na_rep="\\N")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
+def fill_consp_labels(cursor, df):
+    # insert the conspiracy labels of all rows of a DataFrame at once and return the label ids aligned with the rows,
+    # None for rows without labels (no label_pred)
+    label_ids = pd.Series(None, index=df.index, dtype=object)
+    if 'label_pred' not in df.columns:
+        return label_ids
+    labeled = df[df['label_pred'].notna()]
+    labels = pd.DataFrame({
+        "V1_bin": labeled['label_pred'].astype(bool),
+        "V1_prob": labeled['label_pred_probability'],
+        "V2_GR_bin": labeled['label_GR'].astype(bool),
+        "V2_GR_prob": labeled['label_GR_probability'],
+        "V2_NWO_bin": labeled['v2_NWO'].astype(bool),
+        "V2_NWO_prob": labeled['label_NWO_probability']
+    })
+    labels.insert(0, "id", reserve_ids(cursor, "labels_consp", len(labels)))
+    copy_frame(cursor, "labels_consp", labels)
+    label_ids[labeled.index] = labels['id'].to_numpy()
+    return label_ids
+
+def fill_liwc_labels(cursor, df):
+    # insert the LIWC labels of all rows of a DataFrame at once and return the label ids aligned with the rows,
+    # None for rows without labels (no Segment)
+    label_ids = pd.Series(None, index=df.index, dtype=object)
+    if 'Segment' not in df.columns:
+        return label_ids
+    labeled = df[df['Segment'].notna()]
+    labels = labeled[LIWC_COLUMNS].copy()
+    labels[["Segment", "WC"]] = labels[["Segment", "WC"]].round().astype("Int64")
+    labels.insert(0, "id", reserve_ids(cursor, "labels_liwc", len(labels)))
+    copy_frame(cursor, "labels_liwc", labels)
+    label_ids[labeled.index] = labels['id'].to_numpy()
+    return label_ids
+
+def bulk_insert_posts(cursor, platform_table, platform_columns, posts, chunk, labels=("consp", "liwc")):
+    # Insert the posts of a chunk with one COPY per table: platform rows (through a staging table, skipping posts already
+    # in the table), the labels of the chunk rows of the new posts and their content rows. Each post is a dictionary of the
+    # platform values, the content values up to the language and the position of its row in the chunk. 
+    # Returns the number of skipped posts
+    platform_ids = copy_platform_rows(cursor, platform_table, platform_columns, [post['platform'] for post in posts])
+    new_posts = [(post, platform_id) for post, platform_id in zip(posts, platform_ids) if platform_id is not None]
+
+    new_rows = chunk.iloc[[post['row'] for post, _ in new_posts]].reset_index(drop=True)
+    consp_ids = fill_consp_labels(cursor, new_rows) if "consp" in labels else pd.Series(None, index=new_rows.index, dtype=object)
+    liwc_ids = fill_liwc_labels(cursor, new_rows) if "liwc" in labels else pd.Series(None, index=new_rows.index, dtype=object)
+    content_data = [tuple(post['content']) + (platform_id, liwc_id, consp_id)
+                    for (post, platform_id), liwc_id, consp_id in zip(new_posts, liwc_ids.tolist(), consp_ids.tolist())]
+    fill_content(content_data, cursor)
+    return len(posts) - len(new_posts)
+
+def insert_posts_isolated(cursor, platform_table, platform_columns, posts, chunk, labels, rejects):
+    # Insert posts within a savepoint. If the batch fails with a data error, it is rolled back to the savepoint and its halves
+    # are inserted separately, until the failing posts are isolated and added to rejects with their error. Other errors
+    # (connection loss, deadlocks, bugs) are raised. Returns the number of skipped posts
+    if not posts:
+        return 0
+    cursor.execute("SAVEPOINT post_batch;")
+    try:
+        skipped = bulk_insert_posts(cursor, platform_table, platform_columns, posts, chunk, labels)
+        cursor.execute("RELEASE SAVEPOINT post_batch;")
+        return skipped
+    except Exception as e:
+        if cursor.connection.closed or (getattr(e, "pgcode", None) or "")[:2] not in REJECT_ERROR_CLASSES:
+            raise
+        cursor.execute("ROLLBACK TO SAVEPOINT post_batch; RELEASE SAVEPOINT post_batch;")
+        if len(posts) == 1:
+            rejects.append((posts[0], e))
+            return 0
+        middle = len(posts) // 2
+        return (insert_posts_isolated(cursor, platform_table, platform_columns, posts[:middle], chunk, labels, rejects) +
+                insert_posts_isolated(cursor, platform_table, platform_columns, posts[middle:], chunk, labels, rejects))
+
+def load_posts(cursor, connection, platform_table, platform_columns, posts, chunk, logname, labels=("consp", "liwc")):
+    # insert the posts of a chunk in one transaction, so that a post is stored with its labels and content or not at all;
+    # posts which fail are written to the reject file of the log, chunks failing with a transient error are loaded again
+    # and connection errors are raised
+    if not posts:
+        return
+    for attempt in range(1, CHUNK_ATTEMPTS + 1):
+        rejects = []
+        try:
+            skipped = insert_posts_isolated(cursor, platform_table, platform_columns, posts, chunk, labels, rejects)
+            connection.commit()
+            break
+        except Exception as e:
+            if connection.closed:
+                raise
+            connection.rollback()  # Roll back on error
+            if getattr(e, "pgcode", None) in RETRY_ERROR_CODES and attempt < CHUNK_ATTEMPTS:
+                add_to_log(logname, f"Chunk insertion attempt {attempt} failed, retrying: {e}\n")
+                continue
+            add_to_log(logname, f"Chunk insertion error: {e}\n")
+            return
+
+    for post, error in rejects:
+        add_to_rejects(logname, chunk.iloc[post['row']].to_dict(), str(error).strip())
+    if rejects:
+        add_to_log(logname, f"{len(rejects)} posts rejected, see {logname}_rejects.jsonl\n")
+    if skipped:
+        add_to_log(logname, f"{skipped} posts already in {platform_table} skipped\n")
+
+def convert_rows(df, column, convert, logname):
+    # apply a conversion to each value of a column; rows whose value cannot be converted are written to the reject file
+    # of the log with the error and left out, so that a malformed value only loses its own row.
+    # Returns the remaining rows and their converted values
+    converted = []
+    failed = []
+    for position, value in enumerate(df[column].tolist()):
+        try:
+            converted.append(convert(value))
+        except Exception as e:
+            failed.append(position)
+            add_to_rejects(logname, df.iloc[position].to_dict(), f"Invalid {column} value {value!r}: {e}")
+    if not failed:
+        return df, converted
+    add_to_log(logname, f"{len(failed)} rows with invalid {column} values rejected, see {logname}_rejects.jsonl\n")
+    return df.drop(index=df.index[failed]).reset_index(drop=True), converted
+
+def fill_author_index(cursor, connection, platform):
+    # add the authors of all posts of a platform to the author index, posts already indexed are skipped
+    try:
+        cursor.execute(f"""
+        INSERT INTO author_index (author_norm, platform, content_id)
+        {AUTHOR_INDEX_SOURCES[platform]}
+        ON CONFLICT DO NOTHING;
+        """)
         connection.commit()
+    except Exception as e:
+        connection.rollback()  # Roll back on error
+        add_to_log("author_index", f"Author index insertion error for {platform}: {e}\n")
 
-    return label_liwc_id
+def get_altnews_files():
+    alt_news_path= "".join([BASE_PATH, "0_Full_Data_Classified/AlternativeMedia/"])
+    return get_valid_filepaths(alt_news_path)
 
-def fill_altnews(cursor, connection):  
+def load_altnews_liwc():
+    path_liwc = "".join([BASE_PATH, "/3_EN_culturepaper_LIWC/en_alt_testdata_prep_liwc.csv"])
+    liwc_df = get_df(path_liwc)
+    return liwc_df[['url', 'Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
+
+def fill_altnews_file(cursor, connection, filepath, liwc_red):
     def transform_timestamp(timestamp):
         berlin_tz = pytz.timezone('Europe/Berlin')
-        parsed_date = datetime.strptime(f'20{timestamp}', '%Y-%m-%d')
+        parsed_date = datetime.datetime.strptime(f'20{timestamp}', '%Y-%m-%d')
         berlin_time = berlin_tz.localize(parsed_date)
         return berlin_time.strftime('%Y-%m-%d %H:%M:%S%z')
 
     regex_lang = r"\/AlternativeMedia\/([^\/]*)"
     regex_subplat = r"fi_(enc_)?([^_]+)_"
-    
-    alt_news_path= "".join([BASE_PATH, "0_Full_Data_Classified/AlternativeMedia/"])
-    all_files = get_valid_filepaths(alt_news_path)
 
-    path_liwc = "".join([BASE_PATH, "/3_EN_culturepaper_LIWC/en_alt_testdata_prep_liwc.csv"])
-    liwc_df = get_df(path_liwc)
-    liwc_red = liwc_df[['url', 'Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
+    print(filepath)
+    subplatform = re.search(regex_subplat, filepath).group(2)
+    language = re.search(regex_lang, filepath).group(1)
+    df = get_df(filepath)
+    clean_df = clean_table_cols(df)
+    prepped_df = preprocess_text_parallel("altnews", clean_df, workers=PREPROCESS_WORKERS)
+    if language == "eng":
+        write_df = pd.merge(prepped_df, liwc_red, on='url', how="left")
+    else:
+        write_df = prepped_df.copy()
+
+    if "compact" in filepath:
+        write_df['formatted_title'] = write_df['title'].str.lower().str.replace(' ', '-')
+        write_df['url'] = write_df['date'] + '/' + write_df['formatted_title']
+
+    write_df = write_df[write_df['date'].notna()].reset_index(drop=True)
+    write_df, dates = convert_rows(write_df, 'date', lambda date: transform_timestamp(date) if re.match(r'\d{2}-\d{2}-\d{2}', date) else date, "alt_news")
+
+    posts = []
+    for position, (row, date) in enumerate(zip(write_df.to_dict('records'), dates)):
+        author = row['author'] if "author" in row else None
+        timestamp = row['timestamp'] if "timestamp" in row else None
+
+        posts.append({
+            'platform': (row['url'], author),
+            'content': (date, timestamp, row['text'], row['title'], row["text_prep"], 'alt_news', subplatform, language),
+            'row': position
+        })
+
+    load_posts(cursor, connection, "alt_news", ["url", "author"], posts, write_df, "alt_news",
+               labels=("consp", "liwc") if language == "eng" else ("consp",))
+
+def fill_altnews(cursor, connection):  
+    all_files = get_altnews_files()
+    liwc_red = load_altnews_liwc()
 
-    content_data = []
     for filepath in tqdm(all_files, total=len(all_files)):
-        print(filepath)
-        content_data = []
-        subplatform = re.search(regex_subplat, filepath).group(2)
-        language = re.search(regex_lang, filepath).group(1)
-        df = get_df(filepath)
-        clean_df = clean_table_cols(df)
-        prepped_df = preprocess_text("altnews", clean_df)
-        if language == "eng":
-            write_df = pd.merge(prepped_df, liwc_red, on='url', how="left")
-        else:
-            write_df = prepped_df.copy()
-
-        if "compact" in filepath:
-            write_df['formatted_title'] = write_df['title'].str.lower().str.replace(' ', '-')
-            write_df['url'] = write_df['date'] + '/' + write_df['formatted_title']
-
-        
-        for index, row in write_df.iterrows():
-            if not pd.isna(row['date']):
-                author = row['author'] if "author" in row else None
-                timestamp = row['timestamp'] if "timestamp" in row else None
-                try:
-                    cursor.execute("""
-                    INSERT INTO alt_news (url, author)
-                    VALUES (%s, %s)
-                    RETURNING id;
-                    """, (row['url'], author))
-                    alt_news_id = cursor.fetchone()[0]
-                    connection.commit()
-
-                    label_consp_id = fill_consp_label(cursor, connection, row)
-
-                    if re.match(r'\d{2}-\d{2}-\d{2}',row['date']):
-                        date = transform_timestamp(row['date'])
-                    else:
-                        date = row['date']
+        fill_altnews_file(cursor, connection, filepath, liwc_red)
 
-                    if language == "eng":
-                        label_liwc_id = fill_liwc_label(cursor, connection, row)
-                        content_data.append((date, timestamp, row['text'], row['title'], row["text_prep"], 'alt_news', subplatform, language, 
-                                        alt_news_id, label_liwc_id, label_consp_id))
-                    else:
-                        content_data.append((date, timestamp, row['text'], row['title'], row["text_prep"], 'alt_news', subplatform, language, 
-                                        alt_news_id, None, label_consp_id))
+    fill_author_index(cursor, connection, "alt_news")
+    refresh_rollup_tables(cursor, connection)
 
-                except Exception as e:
-                    connection.rollback()  # Roll back on error
-                    add_to_log("alt_news", f"Post insertion error: {e}\n")
-            
-        try:
-            fill_content(content_data, cursor)
-            connection.commit()
-        except Exception as e:
-                print(f"Error inserting Alternative News Content: {e}\n")
-                add_to_log("alt_news", f"Content insertion error: {e}\n")
-                connection.rollback()  # Roll back on error
-
-def fill_legnews(cursor, connection):
-    
-    regex_lang = r"leg_media_([^_]*)"
-    
+def get_legnews_files():
     leg_news_path = "".join([BASE_PATH, "0_Full_Data_Classified/LegacyMedia/"])
-    all_files = get_valid_filepaths(leg_news_path)
+    return get_valid_filepaths(leg_news_path)
 
+def load_legnews_liwc():
     path_liwc = "".join([BASE_PATH, "3_EN_culturepaper_LIWC/legacym_testdata_prep_new_liwc.csv"])
     liwc_df = get_df(path_liwc)
-    liwc_red = liwc_df[['id', 'Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
+    return liwc_df[['id', 'Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
+
+def fill_legnews_file(cursor, connection, filepath, liwc_red):
+    regex_lang = r"leg_media_([^_]*)"
+
+    language = "ger" if re.search(regex_lang, filepath).group(1) == "de" else "eng"
 
-    content_data = []
+    chunksize = 10 ** 4
+    enc = get_encoding(filepath)
+    with pd.read_csv(filepath, chunksize=chunksize, encoding=enc, low_memory=False) as reader:
+        for chunk in reader:
+            # apply preprocessing to chunk
+            prepped_chunk = preprocess_text_parallel("legacy", chunk, workers=PREPROCESS_WORKERS)
+            write_chunk = pd.merge(prepped_chunk, liwc_red, on='id', how="left")
+            write_chunk['id'] = write_chunk.id.replace(r'Dokument', '', regex=True)
+
+            posts = []
+            for position, row in enumerate(write_chunk.to_dict('records')):
+                # if not faz
+                if ('ArticleID') not in row or (pd.isna(row['ArticleID'])):
+                    info_tuple_legacy = (row['meta'], row['terms'], row['author'], None, row['id'], row['section'])
+                    info_tuple_content = (row['time'], None, row['textonly'], row['title'], row["text_prep"], 'legacy_news', row["media"], language)
+                else: # if faz
+                    url = row['Weblink'] if not pd.isna(row['Weblink']) else None
+                    info_tuple_legacy = (row['meta'], row['terms'], row['Name'], url,  row['ArticleID'], row['Ressort'])
+                    info_tuple_content = (row['time'], None, row['Text'], row['Titel'], row["text_prep"], 'legacy_news', "faz", language)
+
+                posts.append({
+                    'platform': info_tuple_legacy,
+                    'content': info_tuple_content,
+                    'row': position
+                })
+
+            # write to db
+            load_posts(cursor, connection, "legacy_news", ["meta", "terms", "author", "url", "article_id", "section"], posts, write_chunk, "legacy_news")
+
+def fill_legnews(cursor, connection):
+    all_files = get_legnews_files()
+    liwc_red = load_legnews_liwc()
 
     for filepath in tqdm(all_files, total=len(all_files)):
-        language = "ger" if re.search(regex_lang, filepath).group(1) == "de" else "eng"
+        fill_legnews_file(cursor, connection, filepath, liwc_red)
 
-        chunksize = 10 ** 4
-        enc = get_encoding(filepath)
-        with pd.read_csv(filepath, chunksize=chunksize, encoding=enc, low_memory=False) as reader:
-            for chunk in reader:
-                # apply preprocessing to chunk
-                prepped_chunk = preprocess_text("legacy", chunk)
-                write_chunk = pd.merge(prepped_chunk, liwc_red, on='id', how="left")
-                write_chunk['id'] = write_chunk.id.replace(r'Dokument', '', regex=True)
-                # write to db
-
-                for index, row in write_chunk.iterrows():
-                    # if not faz
-                    if ('ArticleID') not in row or (pd.isna(row['ArticleID'])):
-                        info_tuple_legacy = (row['meta'], row['terms'], row['author'], None, row['id'], row['section'])
-                    else: # if faz
-                        url = row['Weblink'] if not pd.isna(row['Weblink']) else None
-                        info_tuple_legacy = (row['meta'], row['terms'], row['Name'], url,  row['ArticleID'], row['Ressort'])
-                    
-                    try:
-                        cursor.execute("""
-                        INSERT INTO legacy_news (meta, terms, author, url, article_id, section)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        RETURNING id;
-                        """, info_tuple_legacy)
-                        alt_news_id = cursor.fetchone()[0]
-                        label_consp_id = fill_consp_label(cursor, connection, row)
-                        label_liwc_id = fill_liwc_label(cursor, connection, row) 
-                        
-                        # if not faz
-                        if ('ArticleID') not in row or (pd.isna(row['ArticleID'])):
-                            info_tuple_content = (row['time'], None, row['textonly'], row['title'], row["text_prep"], 'legacy_news', row["media"], language, 
-                                                alt_news_id, label_liwc_id, label_consp_id)
-                        else: # if faz
-                            info_tuple_content = (row['time'], None, row['Text'], row['Titel'], row["text_prep"], 'legacy_news', "faz", language, 
-                                                alt_news_id, label_liwc_id, label_consp_id)
-                        
-                        connection.commit()
-                        content_data.append(info_tuple_content)
-        
-                    except Exception as e:
-                        connection.rollback()  # Roll back on error
-    
-                        add_to_log("legacy_news", f"Post insertion error: {e}\n")
-                    
-    try:
-        fill_content(content_data, cursor)
-        connection.commit()
-    except Exception as e:
-            print(f"Error inserting Legacy News Content: {e}\n")
-            add_to_log("leg_news", f"Content insertion error: {e}\n")
-            connection.rollback()  # Roll back on error
+    fill_author_index(cursor, connection, "legacy_news")
+    refresh_rollup_tables(cursor, connection)
 
-def fill_4chan(cursor, connection): 
+def get_4chan_files():
+    return ["".join([BASE_PATH, "0_Full_Data_Classified/4chan/classified_fi_4chan_all_data_prepro.csv"])]
+
+def load_4chan_liwc():
+    path_liwc = "".join([BASE_PATH, "3_EN_culturepaper_LIWC/4chan_testdata_prep_new_liwc.csv"])
+    liwc_df = get_df(path_liwc)
+    return liwc_df[['thread_id', 'doc_id', 'num', 'Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
+
+def fill_4chan_file(cursor, connection, filepath, liwc_red):
     def transform_num_timestamp(timestamp):
         berlin_tz = pytz.timezone('Europe/Berlin')
         berlin_time = datetime.datetime.fromtimestamp(timestamp, berlin_tz)
 
         return berlin_time.strftime('%Y-%m-%d %H:%M:%S%z')
 
-    filepath = "".join([BASE_PATH, "0_Full_Data_Classified/4chan/classified_fi_4chan_all_data_prepro.csv"])
-    path_liwc = "".join([BASE_PATH, "3_EN_culturepaper_LIWC/4chan_testdata_prep_new_liwc.csv"])
-    liwc_df = get_df(path_liwc)
-    liwc_red = liwc_df[['thread_id', 'doc_id', 'num', 'Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
-
-
     chunksize = 10 ** 4
     enc = get_encoding(filepath)
     with pd.read_csv(filepath, chunksize=chunksize, encoding=enc, low_memory=False) as reader:
         for chunk in reader:
-            content_data = []
             # apply preprocessing to chunk
             clean_chunk = clean_table_cols(chunk, check_string=False)
-            prepped_chunk = preprocess_text("4chan", clean_chunk)
+            prepped_chunk = preprocess_text_parallel("4chan", clean_chunk, workers=PREPROCESS_WORKERS)
             write_chunk = pd.merge(prepped_chunk, liwc_red, on=['thread_id', 'doc_id', 'num'], how="left")
+            write_chunk, timestamps = convert_rows(write_chunk, 'timestamp', transform_num_timestamp, "4chan")
 
-            for index, row in write_chunk.iterrows():
-                try:
-                    cursor.execute("""
-                    INSERT INTO fourchan (media_link, author, nreplies, num, doc_id, op, poster_country, referencing_comment, searchterm, subnum, thread_id, comments)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id;
-                    """, (row['media_link'], row['name'], row['nreplies'], row['num'],  row['doc_id'], row['op'], row['poster_country'], row['referencing_comment'], row['searchterm'], row['subnum'], row['thread_id'], row['comments']))
-                    alt_news_id = cursor.fetchone()[0]
-                    connection.commit()
-
-                    label_consp_id = fill_consp_label(cursor, connection, row)
-                    label_liwc_id = fill_liwc_label(cursor, connection, row) 
-                    content_data.append((row['fourchan_date'], transform_num_timestamp(row['timestamp']), row['text.x'], row['title'], row["text_prep"], '4chan', 'pol', "eng", 
-                                     alt_news_id, label_liwc_id, label_consp_id))
-    
-                except Exception as e:
-                    connection.rollback()  # Roll back on error
+            posts = []
+            for position, (row, timestamp) in enumerate(zip(write_chunk.to_dict('records'), timestamps)):
+                posts.append({
+                    'platform': (row['media_link'], row['name'], row['nreplies'], row['num'],  row['doc_id'], row['op'], row['poster_country'], row['referencing_comment'], row['searchterm'], row['subnum'], row['thread_id'], row['comments']),
+                    'content': (row['fourchan_date'], timestamp, row['text.x'], row['title'], row["text_prep"], '4chan', 'pol', "eng"),
+                    'row': position
+                })
 
-                    add_to_log("4chan", f"Post insertion error: {e}\n")
-                
-            try:
-                fill_content(content_data, cursor)
-                connection.commit()
-            except Exception as e:
-                    add_to_log("4chan", f"Content insertion error: {e}\n")
-                    connection.rollback()  # Roll back on error
+            load_posts(cursor, connection, "fourchan", ["media_link", "author", "nreplies", "num", "doc_id", "op", "poster_country", "referencing_comment", "searchterm", "subnum", "thread_id", "comments"], posts, write_chunk, "4chan")
 
-def fill_reddit(cursor, connection):
-    def create_reddit_url(input_row):
-        if input_row.type == "RC":
-            return "".join(["reddit.com/r/", str(input_row['subreddit']), "/comments/", str(input_row['link_id']), "/comment/", str(input_row['id'])])
-        elif input_row.type == "RS":
-            return "".join(["reddit.com", str(input_row['permalink'])])
+def fill_4chan(cursor, connection): 
+    liwc_red = load_4chan_liwc()
+    for filepath in get_4chan_files():
+        fill_4chan_file(cursor, connection, filepath, liwc_red)
 
-    def unix_to_datetime(unix_timestamp):
-        return datetime.datetime.utcfromtimestamp(int(unix_timestamp))
-    
-    regex_lang = r"_reddit_([^_]*)"
-    
-    leg_news_path = "".join([BASE_PATH, "0_Full_Data_Classified/Reddit/"])
-    all_files = get_valid_filepaths(leg_news_path)
+    fill_author_index(cursor, connection, "4chan")
+    refresh_rollup_tables(cursor, connection)
+
+def create_reddit_url(input_row):
+    if input_row.type == "RC":
+        return "".join(["reddit.com/r/", str(input_row['subreddit']), "/comments/", str(input_row['link_id']), "/comment/", str(input_row['id'])])
+    elif input_row.type == "RS":
+        return "".join(["reddit.com", str(input_row['permalink'])])
+
+def get_reddit_files():
+    reddit_path = "".join([BASE_PATH, "0_Full_Data_Classified/Reddit/"])
+    return get_valid_filepaths(reddit_path)
 
+def load_reddit_liwc():
     path_liwc = "".join([BASE_PATH, "3_EN_culturepaper_LIWC/reddit_testdata_prep_liwc.csv"])
     liwc_df = get_df(path_liwc)
     liwc_df['url'] = liwc_df.apply(create_reddit_url, axis=1)
-    liwc_red = liwc_df[['url','Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
+    return liwc_df[['url','Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
 
+def fill_reddit_file(cursor, connection, filepath, liwc_red):
+    def unix_to_datetime(unix_timestamp):
+        return datetime.datetime.utcfromtimestamp(int(unix_timestamp))
     
+    regex_lang = r"_reddit_([^_]*)"
+
+    language = "ger" if re.search(regex_lang, filepath).group(1) == "de" else "eng"
+
+    chunksize = 10 ** 3
+    enc = get_encoding(filepath)
+    try:
+        with pd.read_csv(filepath, chunksize=chunksize, encoding=enc, low_memory=False, on_bad_lines="warn") as reader:
+            for chunk in reader:
+                # apply preprocessing to chunk
+                prepped_chunk = preprocess_text_parallel("reddit", chunk, workers=PREPROCESS_WORKERS)
+                prepped_chunk['url'] = prepped_chunk.apply(create_reddit_url, axis=1)
+                chunk_liwc = liwc_red[liwc_red['url'].isin(prepped_chunk['url'])]
+                write_chunk = pd.merge(prepped_chunk, chunk_liwc, on=['url'], how="left")
+                write_chunk, created = convert_rows(write_chunk, 'created_utc', unix_to_datetime, "reddit")
+
+                posts = []
+                for position, (row, created_datetime) in enumerate(zip(write_chunk.to_dict('records'), created)):
+                    if pd.notna(row['parent_id']) and pd.notna(row['id']):
+                        searchterm = None if ('searchterm') not in row or (pd.isna(row['searchterm'])) else row['searchterm']
+                        coded = True if "fi_condensed" in filepath and row['subreddit'] != "cringe" else False
+
+                        if row['type'] == "RC": # reddit comment
+                            info_tuple = (row['author'], row['id'], row['link_id'], row['parent_id'], searchterm, None, row['terms'], "RC", row['url'], coded)
+                            info_tuple_content = (row['time_utc'], created_datetime, row['body'], None, row["text_prep"], 'reddit', row['subreddit'], language)
+                        else: # reddit submission
+                            info_tuple = (row['author'], row['id'], None, row['parent_id'],  searchterm, row['selftext'], row['terms'], "RS", row['url'], coded)
+                            info_tuple_content = (row['time_utc'], created_datetime, row['selftext'], row['title'], row["text_prep"], 'reddit', row['subreddit'], language)
+
+                        posts.append({
+                            'platform': info_tuple,
+                            'content': info_tuple_content,
+                            'row': position
+                        })
+                    else:
+                        add_to_log("reddit", f"NaN values in id or parent id for:\n{row}\n")
+
+                load_posts(cursor, connection, "reddit", ["author", "post_id", "link_id", "parent_id", "searchterm", "selftext", "terms", "type", "url", "coded"], posts, write_chunk, "reddit")
+    except Exception as e:
+        print(f"Error processing file {filepath}: {e}")
+
+def fill_reddit(cursor, connection):
+    all_files = get_reddit_files()
+    liwc_red = load_reddit_liwc()
 
     for filepath in tqdm(all_files, total=len(all_files)):
-        language = "ger" if re.search(regex_lang, filepath).group(1) == "de" else "eng"
+        fill_reddit_file(cursor, connection, filepath, liwc_red)
 
-        chunksize = 10 ** 3
-        enc = get_encoding(filepath)
-        try:
-            with pd.read_csv(filepath, chunksize=chunksize, encoding=enc, low_memory=False, on_bad_lines="warn") as reader:
-                for chunk in reader:
-                    content_data = []
-
-
-                    # apply preprocessing to chunk
-                    prepped_chunk = preprocess_text("reddit", chunk)
-                    prepped_chunk['url'] = prepped_chunk.apply(create_reddit_url, axis=1)
-                    liwc_red = liwc_red[liwc_red['url'].isin(prepped_chunk['url'])]
-                    write_chunk = pd.merge(prepped_chunk, liwc_red, on=['url'], how="left")
-
-                    for index, row in write_chunk.iterrows():
-                        if pd.notna(row.parent_id) and pd.notna(row.id):
-                            searchterm = None if ('searchterm') not in row or (pd.isna(row['searchterm'])) else row['searchterm']
-                            coded = True if "fi_condensed" in filepath and row['subreddit'] != "cringe" else False
-
-                            if row.type == "RC": # reddit comment
-                                info_tuple = (row['author'], row['id'], row['link_id'], row['parent_id'], searchterm, None, row['terms'], "RC", row['url'], coded)
-                            else: # reddit submission
-                                info_tuple = (row['author'], row['id'], None, row['parent_id'],  searchterm, row['selftext'], row['terms'], "RS", row['url'], coded)
-                            try:
-                                cursor.execute("""
-                                INSERT INTO reddit (author, post_id, link_id, parent_id, searchterm, selftext, terms, type, url, coded)
-                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                                RETURNING id;
-                                """, info_tuple)
-                                alt_news_id = cursor.fetchone()[0]
-                                connection.commit()
-
-                                label_consp_id = fill_consp_label(cursor, connection, row) if not pd.isna(row.label_pred) else None
-                                label_liwc_id = fill_liwc_label(cursor, connection, row) if not pd.isna(row.Segment) else None
-                                # reddit comment
-                                if row.type == "RC":
-                                    info_tuple_content = (row['time_utc'], unix_to_datetime(row['created_utc']), row['body'], row["text_prep"], None, 'reddit', row['subreddit'], language, 
-                                                        alt_news_id, label_liwc_id, label_consp_id)
-                                else: # reddit submission
-                                    info_tuple_content = (row['time_utc'], unix_to_datetime(row['created_utc']), row['selftext'], row["text_prep"], row['title'], 'reddit', row['subreddit'], language, 
-                                                        alt_news_id, label_liwc_id, label_consp_id)
-
-                                content_data.append(info_tuple_content)
-                
-                            except Exception as e:
-                                connection.rollback()  # Roll back on error
-                                print(str(e))
-                                traceback.print_exc(file=sys.stdout)
-                                print(str(e))
-                                add_to_log("reddit", f"Post insertion error: {e}\n")
-                        else:
-                            add_to_log("reddit", f"NaN values in id or parent id for:\n{row}\n")
-
-                    try:
-                        fill_content(content_data, cursor)
-                        connection.commit()
-                    except Exception as e:
-                            add_to_log("reddit", f"Content insertion error: {e}\n")
-                            connection.rollback()  # Roll back on error
-        except Exception as e:
-            print(f"Error processing file {filepath}: {e}")
+    fill_author_index(cursor, connection, "reddit")
+    refresh_rollup_tables(cursor, connection)
 
 def fill_twitter(cursor, connection):
     print("Populating twitter users...")
@@ -358,72 +456,66 @@ def fill_twitter(cursor, connection):
     print("Populating tweets...")
     fill_tweets(cursor, connection)
     fill_liwc_tweets(cursor, connection)
+    fill_author_index(cursor, connection, "twitter")
+    refresh_rollup_tables(cursor, connection)
 
-def fill_tweets(cursor, connection):
-    def get_filtered_liwc(key_df, key_column, chunk_size=10 ** 4):
-        filtered_rows = []
-        
-        path_liwc = "".join([BASE_PATH, "/3_EN_culturepaper_LIWC/kilian_testweeks_r1full_r2call_en_fi_prep_new_liwc.csv"])    
-        # Iterate over each chunk of the file
-        for chunk in pd.read_csv(path_liwc, chunksize=chunk_size):
-            # Filter rows where the key_column value is in the key_df
-            filtered_chunk = chunk[chunk[key_column].isin(key_df[key_column])]
-            # Reduce to relevant columns
-            filtered_chunk = filtered_chunk[['id', 'Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
-            filtered_rows.append(filtered_chunk)
-        
-        # Concatenate all filtered rows into a single DataFrame
-        filtered_df = pd.concat(filtered_rows, ignore_index=True)
-        return filtered_df
+def get_filtered_tweets_liwc(key_df, key_column, chunk_size=10 ** 4):
+    filtered_rows = []
     
-    regex_lang = r"TwitterTweets\/([^\/]*)"
+    path_liwc = "".join([BASE_PATH, "/3_EN_culturepaper_LIWC/kilian_testweeks_r1full_r2call_en_fi_prep_new_liwc.csv"])    
+    # Iterate over each chunk of the file
+    for chunk in pd.read_csv(path_liwc, chunksize=chunk_size):
+        # Filter rows where the key_column value is in the key_df
+        filtered_chunk = chunk[chunk[key_column].isin(key_df[key_column])]
+        # Reduce to relevant columns
+        filtered_chunk = filtered_chunk[['id', 'Segment', 'WC', 'BigWords', 'prep', 'allnone', 'cogproc', 'insight', 'cause', 'discrep', 'tentat', 'certitude', 'differ', 'emotion', 'emo_pos', 'emo_neg', 'emo_anx', 'emo_anger', 'emo_sad']]
+        filtered_rows.append(filtered_chunk)
+    
+    # Concatenate all filtered rows into a single DataFrame
+    filtered_df = pd.concat(filtered_rows, ignore_index=True)
+    return filtered_df
 
+def get_tweets_files():
     tweets_path= "".join([BASE_PATH, "0_Full_Data_Classified/TwitterTweets/"])
-    all_files = get_valid_filepaths(tweets_path)
+    return get_valid_filepaths(tweets_path)
+
+def load_tweets_liwc():
+    # the LIWC labels of each chunk are read with get_filtered_tweets_liwc
+    return None
+
+def fill_tweets_file(cursor, connection, filepath, liwc_red=None):
+    regex_lang = r"TwitterTweets\/([^\/]*)"
 
     chunksize = 10 ** 4
+    enc = get_encoding(filepath)
+    try:
+        language = "ger" if re.search(regex_lang, filepath).group(1) == "ger" else "eng"
+        with pd.read_csv(filepath, chunksize=chunksize, encoding=enc, engine='python') as reader:
+            for chunk in reader:
+                clean_chunk = clean_table_cols(chunk)
+                prepped_chunk = preprocess_text_parallel("twitter", clean_chunk, workers=PREPROCESS_WORKERS)
+                liwc_red = get_filtered_tweets_liwc(prepped_chunk, "id")                    
+                write_chunk = pd.merge(prepped_chunk, liwc_red, on='id', how="left")
+                
+                posts = []
+                for position, row in enumerate(write_chunk.to_dict('records')):
+                    if not pd.isna(row['author']):
+                        sampled = False
+                        posts.append({
+                            'platform': (row['id'], row['ref'], row['refid'], row['author'], sampled),
+                            'content': (row['time'], row['time'], row['text'], None, row["text_prep"], 'twitter', None, language),
+                            'row': position
+                        })
+
+                load_posts(cursor, connection, "twitter", ["tweet_id", "ref", "refid", "author_id", "sampled"], posts, write_chunk, "twitter")
+    except Exception as e:
+        print(f"Error during file handling: {e}\n")
+        add_to_log("twitter", f"Error during file handling: {e}\n")
+
+def fill_tweets(cursor, connection):
+    all_files = get_tweets_files()
     for filepath in tqdm(all_files, total=len(all_files)):
-        enc = get_encoding(filepath)
-        try:
-            language = "ger" if re.search(regex_lang, filepath).group(1) == "ger" else "eng"
-            with pd.read_csv(filepath, chunksize=chunksize, encoding=enc, engine='python') as reader:
-                for chunk in reader:
-                    content_data = []
-                    clean_chunk = clean_table_cols(chunk)
-                    prepped_chunk = preprocess_text("twitter", clean_chunk)
-                    liwc_red = get_filtered_liwc(prepped_chunk, "id")                    
-                    write_chunk = pd.merge(prepped_chunk, liwc_red, on='id', how="left")
-                    
-                    for index, row in write_chunk.iterrows():
-                        if not pd.isna(row['author']):
-                            timestamp = row['timestamp'] if "timestamp" in row else None
-                            sampled = False
-                            try:
-                                cursor.execute("""
-                                INSERT INTO twitter (tweet_id, ref, refid , author_id, sampled)
-                                VALUES (%s, %s, %s, %s, %s)
-                                RETURNING id;
-                                """, (row['id'], row['ref'], row['refid'], row['author'],sampled))
-                                tweet_id = cursor.fetchone()[0]
-                                connection.commit()
-                                
-                                label_consp_id = fill_consp_label(cursor, connection, row) 
-                                label_liwc_id = fill_liwc_label(cursor, connection, row)
-                                content_data.append((row['time'], row['time'], row['text'], None, row["text_prep"], 'twitter', None, language, 
-                                                    tweet_id, label_liwc_id, label_consp_id))
-                            except Exception as e:
-                                connection.rollback()  # Roll back on error
-                                add_to_log("twitter", f"Post insertion error: {e}\n")
-                    
-                    try:
-                        fill_content(content_data, cursor)
-                        connection.commit()
-                    except Exception as e:
-                            add_to_log("twitter", f"Content insertion error: {e}\n")
-                            connection.rollback()  # Roll back on error
-        except Exception as e:
-            print(f"Error during file handling: {e}\n")
-            add_to_log("twitter", f"Error during file handling: {e}\n")
+        fill_tweets_file(cursor, connection, filepath)
 
 def fill_liwc_tweets(cursor, connection):
     def detect_lang(text):
@@ -441,38 +533,21 @@ def fill_liwc_tweets(cursor, connection):
 
     try:
         for chunk in pd.read_csv(path_liwc, chunksize=10 ** 4):
-            content_data = []
             clean_chunk = clean_table_cols(chunk)
-            write_chunk = preprocess_text("twitter", clean_chunk)
+            write_chunk = preprocess_text_parallel("twitter", clean_chunk, workers=PREPROCESS_WORKERS)
             write_chunk['lang'] = write_chunk['text'].apply(detect_lang)
             
-            for index, row in write_chunk.iterrows():
+            posts = []
+            for position, row in enumerate(write_chunk.to_dict('records')):
                 if not pd.isna(row['author']):
-                    timestamp = row['timestamp'] if "timestamp" in row else None
                     sampled = True
-                    try:
-                        cursor.execute("""
-                        INSERT INTO twitter (tweet_id, ref, refid , author_id, sampled)
-                        VALUES (%s, %s, %s, %s, %s)
-                        RETURNING id;
-                        """, (row['id'], row['ref'], row['refid'], row['author'],sampled))
-                        tweet_id = cursor.fetchone()[0]
-                        connection.commit()
-                        
-                        label_consp_id = None
-                        label_liwc_id = fill_liwc_label(cursor, connection, row)
-                        content_data.append((row['time'], row['time'], row['text'], None, row["text_prep"], 'twitter', None, row['lang'], 
-                                            tweet_id, label_liwc_id, label_consp_id))
-                    except Exception as e:
-                        connection.rollback()  # Roll back on error
-                        add_to_log("twitter", f"Post insertion error: {e}\n")
-            
-            try:
-                fill_content(content_data, cursor)
-                connection.commit()
-            except Exception as e:
-                    add_to_log("twitter", f"Content insertion error: {e}\n")
-                    connection.rollback()  # Roll back on error
+                    posts.append({
+                        'platform': (row['id'], row['ref'], row['refid'], row['author'], sampled),
+                        'content': (row['time'], row['time'], row['text'], None, row["text_prep"], 'twitter', None, row['lang']),
+                        'row': position
+                    })
+
+            load_posts(cursor, connection, "twitter", ["tweet_id", "ref", "refid", "author_id", "sampled"], posts, write_chunk, "twitter", labels=("liwc",))
     except Exception as e:
         print(f"Error during file handling: {e}\n")
         add_to_log("twitter", f"Error during file handling: {e}\n")
@@ -485,19 +560,23 @@ def fill_twitter_users(cursor, connection):
 
     for filepath in tqdm(all_files, total=len(all_files)):
         try:
-            df = pd.read_csv(all_files[0], header=None, index_col=0, names=['author_id','username'])
-            
-            for index, row in df.iterrows():
-                try:
-                    cursor.execute("""
-                    INSERT INTO twitter_user (author_id, username)
-                    VALUES (%s, %s);
-                    """, ((row['author_id'],row['username'])))
-                    
-                    connection.commit()
-
-                except Exception as e:
-                        connection.rollback()  # Roll back on error
-                        add_to_log("twitter_user", f"User insertion error: {e}\n")
+            df = pd.read_csv(filepath, header=None, index_col=0, names=['author_id','username'])
+            stage_table = stage_rows(cursor, "twitter_user", ["author_id", "username"], list(df[['author_id', 'username']].itertuples(index=False)))
+            cursor.execute(f"""
+            INSERT INTO twitter_user (author_id, username)
+            SELECT author_id, username FROM {stage_table}
+            ON CONFLICT DO NOTHING;
+            """)
+            connection.commit()
         except Exception as e:
+            connection.rollback()  # Roll back on error
             add_to_log("twitter_user", f"Error during file handling: {e}\n")
+
+# per platform: list of files to import, loader of the LIWC labels shared by all files and import function of a single file
+FILE_IMPORTS = {
+    "alt_news": (get_altnews_files, load_altnews_liwc, fill_altnews_file),
+    "legacy_news": (get_legnews_files, load_legnews_liwc, fill_legnews_file),
+    "4chan": (get_4chan_files, load_4chan_liwc, fill_4chan_file),
+    "reddit": (get_reddit_files, load_reddit_liwc, fill_reddit_file),
+    "twitter": (get_tweets_files, load_tweets_liwc, fill_tweets_file)
+}
@@ -1,7 +1,32 @@
+# weighted tsvector of title (A) and preprocessed text (B), using the text search configuration of the post's language
+CONTENT_TSV_EXPRESSION = """
+    setweight(to_tsvector(CASE WHEN language = 'ger'::language_type THEN 'german'::regconfig ELSE 'english'::regconfig END, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector(CASE WHEN language = 'ger'::language_type THEN 'german'::regconfig ELSE 'english'::regconfig END, coalesce(text_prep, text)), 'B')
+"""
+
+# content partition name suffix of each platform, named like the platform tables ('4chan' is stored in fourchan)
+PLATFORM_PARTITIONS = {
+    "alt_news": "alt_news",
+    "legacy_news": "legacy_news",
+    "4chan": "fourchan",
+    "reddit": "reddit",
+    "twitter": "twitter"
+}
+
+# normalized author name, platform and platform table id of the posts of each platform, as stored in the author index
+AUTHOR_INDEX_SOURCES = {
+    "alt_news": "SELECT lower(btrim(author)), 'alt_news'::platform_type, id FROM alt_news WHERE author IS NOT NULL",
+    "legacy_news": "SELECT lower(btrim(author)), 'legacy_news'::platform_type, id FROM legacy_news WHERE author IS NOT NULL",
+    "4chan": "SELECT lower(btrim(author)), '4chan'::platform_type, id FROM fourchan WHERE author IS NOT NULL",
+    "reddit": "SELECT lower(btrim(author)), 'reddit'::platform_type, id FROM reddit WHERE author IS NOT NULL",
+    "twitter": """SELECT lower(btrim(tu.username)), 'twitter'::platform_type, t.id FROM twitter t
+                  JOIN twitter_user tu ON t.author_id = tu.author_id WHERE tu.username IS NOT NULL"""
+}
+
 def create_table(SQL_STATEMENT, cursor):
     cursor.execute(SQL_STATEMENT)
 
-def create_tables(cursor, connection):
+def create_tables(cursor, connection, partitioned=False, years=()):
     create_types(cursor, connection)
     create_altnews_table(cursor, connection)
     create_legacy_table(cursor, connection)
@@ -11,7 +36,9 @@ def create_tables(cursor, connection):
     create_tweets_table(cursor, connection)
     create_consplabels_table(cursor, connection)
     create_liwclabels_table(cursor, connection)
-    create_content_table(cursor, connection)
+    create_content_table(cursor, connection, partitioned, years)
+    create_rollup_tables(cursor, connection)
+    create_author_index_table(cursor, connection)
 
 def create_types(cursor, connection):
     def create_platform_type():
@@ -40,9 +67,9 @@ def create_types(cursor, connection):
     create_language_type()
     
 
-def create_content_table(cursor, connection):
-    try:
-        SQL_STATEMENT = """ CREATE TABLE IF NOT EXISTS content (
+def content_table_statement(partitioned=False):
+    if not partitioned:
+        return """ CREATE TABLE IF NOT EXISTS content (
         id BIGSERIAL PRIMARY KEY,
         date DATE NOT NULL,
         timestamp TIMESTAMP,
@@ -57,16 +84,70 @@ def create_content_table(cursor, connection):
         label_consp BIGINT UNIQUE,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        text_tsv TSVECTOR GENERATED ALWAYS AS (""" + CONTENT_TSV_EXPRESSION + """) STORED,
         UNIQUE (content_id, platform),
         CONSTRAINT fk_label_liwc FOREIGN KEY (label_liwc) REFERENCES labels_liwc(id) ON DELETE CASCADE,
         CONSTRAINT fk_label_consp FOREIGN KEY (label_consp) REFERENCES labels_consp(id) ON DELETE CASCADE
         );"""
-        create_table(SQL_STATEMENT, cursor)
+
+    # unique constraints of a partitioned table have to contain the partition keys (platform, date)
+    return """ CREATE TABLE IF NOT EXISTS content (
+        id BIGSERIAL,
+        date DATE NOT NULL,
+        timestamp TIMESTAMP,
+        text TEXT NOT NULL,
+        text_prep TEXT,
+        title TEXT,
+        platform platform_type NOT NULL,
+        subplatform VARCHAR(50),
+        language language_type NOT NULL,
+        content_id BIGINT NOT NULL,
+        label_liwc BIGINT,
+        label_consp BIGINT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        text_tsv TSVECTOR GENERATED ALWAYS AS (""" + CONTENT_TSV_EXPRESSION + """) STORED,
+        PRIMARY KEY (id, platform, date),
+        UNIQUE (content_id, platform, date),
+        UNIQUE (label_liwc, platform, date),
+        UNIQUE (label_consp, platform, date),
+        CONSTRAINT fk_label_liwc FOREIGN KEY (label_liwc) REFERENCES labels_liwc(id) ON DELETE CASCADE,
+        CONSTRAINT fk_label_consp FOREIGN KEY (label_consp) REFERENCES labels_consp(id) ON DELETE CASCADE
+        ) PARTITION BY LIST (platform);"""
+
+def content_partitions_statement(years=()):
+    # one partition per platform, subpartitioned by year of the post date, dates of other years go to the default subpartition.
+    # A year has to be added before its posts are loaded, as a default subpartition containing rows of the year blocks it
+    statements = []
+    for platform, suffix in PLATFORM_PARTITIONS.items():
+        statements.append(f"CREATE TABLE IF NOT EXISTS content_{suffix} PARTITION OF content FOR VALUES IN ('{platform}') PARTITION BY RANGE (date);")
+        for year in years:
+            statements.append(f"CREATE TABLE IF NOT EXISTS content_{suffix}_{int(year)} PARTITION OF content_{suffix} FOR VALUES FROM ('{int(year)}-01-01') TO ('{int(year) + 1}-01-01');")
+        statements.append(f"CREATE TABLE IF NOT EXISTS content_{suffix}_default PARTITION OF content_{suffix} DEFAULT;")
+    return "\n".join(statements)
+
+def add_content_partitions(cursor, connection, years):
+    try:
+        cursor.execute(content_partitions_statement(years))
+        connection.commit()
+    except Exception as e:
+        print(f"Error adding content partitions: {e}")
+        connection.rollback()  # Roll back on error
+
+def create_content_table(cursor, connection, partitioned=False, years=()):
+    try:
+        create_table(content_table_statement(partitioned), cursor)
+        if partitioned:
+            create_table(content_partitions_statement(years), cursor)
         connection.commit()
     except Exception as e:
         print(f"Error creating Content Table: {e}")
         connection.rollback()  # Roll back on error
 
+    create_fulltext_search(cursor, connection)
+    create_trigram_search(cursor, connection)
+    create_indexes(cursor, connection, concurrently=False)
+
     try:
         # Create trigger function to set updated_at
         cursor.execute("""
@@ -108,7 +189,8 @@ def create_content_table(cursor, connection):
         CREATE OR REPLACE FUNCTION delete_content_cascade()
         RETURNS TRIGGER AS $$
         BEGIN
-            DELETE FROM content WHERE content_id = OLD.id AND platform = TG_TABLE_NAME;
+            DELETE FROM content WHERE content_id = OLD.id
+                AND platform = (CASE TG_TABLE_NAME WHEN 'fourchan' THEN '4chan' ELSE TG_TABLE_NAME END)::platform_type;
             RETURN OLD;
         END;
         $$ LANGUAGE plpgsql;
@@ -118,15 +200,11 @@ def create_content_table(cursor, connection):
         print(f"Error creating trigger function: {e}")
         connection.rollback()  # Roll back on error
 
+    create_content_trigger(cursor, connection)
+
     try:
         # Add trigger
         cursor.execute("""
-        -- Trigger for Insert and Update
-        CREATE TRIGGER content_validate_and_update
-        BEFORE INSERT OR UPDATE ON content
-        FOR EACH ROW
-        EXECUTE FUNCTION validate_and_manage_content();
-
         -- Triggers for Delete on platform tables
         CREATE TRIGGER delete_alt_news_content
         AFTER DELETE ON alt_news
@@ -158,6 +236,354 @@ def create_content_table(cursor, connection):
         print(f"Error creating trigger: {e}")
         connection.rollback()  # Roll back on error
 
+def create_content_trigger(cursor, connection):
+    try:
+        cursor.execute("""
+        -- Trigger for Insert and Update
+        CREATE TRIGGER content_validate_and_update
+        BEFORE INSERT OR UPDATE ON content
+        FOR EACH ROW
+        EXECUTE FUNCTION validate_and_manage_content();
+        """)
+        connection.commit()
+    except Exception as e:
+        print(f"Error creating content trigger: {e}")
+        connection.rollback()  # Roll back on error
+
+def migrate_content_to_partitioned(cursor, connection, years=None):
+    # copy a monolithic content table into the partitioned layout (by default with a subpartition per year of the existing posts)
+    try:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('content');")
+        if cursor.fetchone()[0] == 'p':
+            print("Content table is already partitioned")
+            return
+        if years is None:
+            cursor.execute("SELECT DISTINCT EXTRACT(YEAR FROM date)::int FROM content ORDER BY 1;")
+            years = [row[0] for row in cursor.fetchall()]
+
+        # free the names of the table, its sequence and indexes for the partitioned table
+        cursor.execute("""
+        ALTER TABLE content RENAME TO content_old;
+        ALTER SEQUENCE content_id_seq RENAME TO content_old_id_seq;
+        DO $$
+        DECLARE
+            idx RECORD;
+        BEGIN
+            FOR idx IN SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'content_old' LOOP
+                EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.indexname, idx.indexname || '_old');
+            END LOOP;
+        END;
+        $$;
+        """)
+        create_table(content_table_statement(partitioned=True), cursor)
+        create_table(content_partitions_statement(years), cursor)
+
+        # rows are copied before the validation trigger exists, they were validated when inserted into the old table
+        cursor.execute("""
+        INSERT INTO content (id, date, timestamp, text, text_prep, title, platform, subplatform, language, content_id, label_liwc, label_consp, created_at, updated_at)
+        SELECT id, date, timestamp, text, text_prep, title, platform, subplatform, language, content_id, label_liwc, label_consp, created_at, updated_at
+        FROM content_old;
+        SELECT setval('content_id_seq', COALESCE((SELECT MAX(id) FROM content), 0) + 1, false);
+        DROP TABLE content_old;
+        """)
+        connection.commit()
+    except Exception as e:
+        print(f"Error migrating Content Table: {e}")
+        connection.rollback()  # Roll back on error
+        return
+
+    create_fulltext_search(cursor, connection)
+    create_trigram_search(cursor, connection)
+    create_indexes(cursor, connection, concurrently=False)
+    create_content_trigger(cursor, connection)
+    create_content_delete_trigger(cursor, connection)
+
+def purge_content_partition(cursor, connection, platform, year=None):
+    # Remove the posts of a platform (and year) with their labels, platform table rows, author index entries and rollup groups.
+    # The content partition is truncated instead of deleting its rows one by one through the delete_content_cascade trigger,
+    # which is disabled while the platform table rows are deleted, as their content rows are already gone.
+    # Truncating a partition doesn't fire the content_deleted trigger, so the delete is counted here (the labels deletes
+    # cascading to content may count it as well); the rollup stays up to date if it was before, as the groups of the
+    # partition are removed from it
+    suffix = PLATFORM_PARTITIONS[platform]
+    partition = f"content_{suffix}" if year is None else f"content_{suffix}_{int(year)}"
+    try:
+        cursor.execute(f"""
+        CREATE TEMP TABLE purged_content ON COMMIT DROP AS SELECT content_id, label_liwc, label_consp FROM {partition};
+        CREATE TEMP TABLE purged_rollup ON COMMIT DROP AS
+        SELECT s.name FROM rollup_state s, content_deletes d WHERE s.name = 'content_rollup' AND s.n_deletes = d.n_deletes;
+        TRUNCATE {partition};
+        DELETE FROM labels_liwc WHERE id IN (SELECT label_liwc FROM purged_content);
+        DELETE FROM labels_consp WHERE id IN (SELECT label_consp FROM purged_content);
+        DELETE FROM author_index WHERE platform = %s AND content_id IN (SELECT content_id FROM purged_content);
+        ALTER TABLE {suffix} DISABLE TRIGGER delete_{suffix}_content;
+        DELETE FROM {suffix} WHERE id IN (SELECT content_id FROM purged_content);
+        ALTER TABLE {suffix} ENABLE TRIGGER delete_{suffix}_content;
+        DELETE FROM content_rollup WHERE platform = %s AND (%s IS NULL OR EXTRACT(YEAR FROM date) = %s);
+        UPDATE content_deletes SET n_deletes = n_deletes + 1;
+        UPDATE rollup_state SET n_deletes = (SELECT n_deletes FROM content_deletes) WHERE name IN (SELECT name FROM purged_rollup);
+        """, (platform, platform, year, year))
+        connection.commit()
+    except Exception as e:
+        print(f"Error purging content partition {partition}: {e}")
+        connection.rollback()  # Roll back on error
+
+def create_fulltext_search(cursor, connection):
+    # add the tsvector column to content tables created without it, its GIN index is one of the SECONDARY_INDEXES
+    try:
+        cursor.execute("""
+        ALTER TABLE content ADD COLUMN IF NOT EXISTS text_tsv TSVECTOR GENERATED ALWAYS AS (""" + CONTENT_TSV_EXPRESSION + """) STORED;
+        """)
+        connection.commit()
+    except Exception as e:
+        print(f"Error creating full-text search column: {e}")
+        connection.rollback()  # Roll back on error
+
+def create_trigram_search(cursor, connection):
+    # trigram indexes let substring (LIKE/ILIKE) and regex matches on the searched text columns use an index scan
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        connection.commit()
+    except Exception as e:
+        print(f"Error creating trigram extension: {e}")
+        connection.rollback()  # Roll back on error
+
+# secondary indexes for the filters of the query wrapper, name -> (table, index definition).
+# content_id lookups use the (content_id, platform) unique constraint, the content platform filter the (platform, date) index
+SECONDARY_INDEXES = {
+    # latest update is used as data version by the query result cache
+    "content_updated_at_idx": ("content", "(updated_at)"),
+    # date range filters and keyset pagination of query results
+    "content_date_id_idx": ("content", "(date, id)"),
+    "content_platform_date_idx": ("content", "(platform, date)"),
+    "content_language_idx": ("content", "(language)"),
+    "content_subplatform_idx": ("content", "(subplatform)"),
+    "content_text_tsv_idx": ("content", "USING GIN (text_tsv)"),
+    # substring and regex matches search the raw text (with URLs and mentions), text_prep and title
+    "content_text_trgm_idx": ("content", "USING GIN (text gin_trgm_ops)"),
+    "content_text_prep_trgm_idx": ("content", "USING GIN (text_prep gin_trgm_ops)"),
+    "content_title_trgm_idx": ("content", "USING GIN (title gin_trgm_ops)"),
+    "twitter_author_id_idx": ("twitter", "(author_id)"),
+    "twitter_user_username_idx": ("twitter_user", "(username)"),
+    "alt_news_author_idx": ("alt_news", "(author)"),
+    "legacy_news_author_idx": ("legacy_news", "(author)"),
+    "fourchan_author_idx": ("fourchan", "(author)"),
+    "reddit_author_idx": ("reddit", "(author)")
+}
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s);", (table,))
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+def create_indexes(cursor, connection, concurrently=True):
+    # Build the missing SECONDARY_INDEXES. Concurrent builds don't block writes but can't run in a transaction block,
+    # so they run in autocommit mode; indexes of partitioned tables are built normally, as they can't be built concurrently
+    connection.commit()
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    try:
+        for name, (table, definition) in SECONDARY_INDEXES.items():
+            try:
+                # an interrupted concurrent build leaves an invalid index behind which IF NOT EXISTS would skip
+                cursor.execute("""
+                SELECT NOT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(%s);
+                """, (name,))
+                row = cursor.fetchone()
+                if row and row[0]:
+                    cursor.execute(f"DROP INDEX {name};")
+                build = "CONCURRENTLY " if concurrently and not is_partitioned(cursor, table) else ""
+                cursor.execute(f"CREATE INDEX {build}IF NOT EXISTS {name} ON {table} {definition};")
+            except Exception as e:
+                print(f"Error creating index {name}: {e}")
+    finally:
+        connection.autocommit = autocommit
+
+def drop_indexes(cursor, connection, concurrently=True):
+    # drop the SECONDARY_INDEXES, e.g. before a bulk load which is faster without index maintenance, create_indexes rebuilds them
+    connection.commit()
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    try:
+        for name, (table, definition) in SECONDARY_INDEXES.items():
+            try:
+                drop = "CONCURRENTLY " if concurrently and not is_partitioned(cursor, table) else ""
+                cursor.execute(f"DROP INDEX {drop}IF EXISTS {name};")
+            except Exception as e:
+                print(f"Error dropping index {name}: {e}")
+    finally:
+        connection.autocommit = autocommit
+
+def index_usage_report(cursor):
+    # scans and size of all indexes since the last statistics reset, largest first; unused indexes have 0 scans
+    cursor.execute("""
+    SELECT s.relname AS table_name, s.indexrelname AS index_name, s.idx_scan, s.idx_tup_read, s.idx_tup_fetch,
+        pg_relation_size(s.indexrelid) AS size_bytes, pg_size_pretty(pg_relation_size(s.indexrelid)) AS size
+    FROM pg_stat_user_indexes s
+    ORDER BY pg_relation_size(s.indexrelid) DESC;
+    """)
+    rows = cursor.fetchall()
+    for table_name, index_name, idx_scan, idx_tup_read, idx_tup_fetch, size_bytes, size in rows:
+        print(f"{table_name:<30} {index_name:<45} scans: {idx_scan:>10} tuples read: {idx_tup_read:>12} size: {size:>10}")
+    return rows
+
+def create_rollup_tables(cursor, connection):
+    try:
+        # post and label counts per day, platform, subplatform ('' for none) and language
+        SQL_STATEMENT = """CREATE TABLE IF NOT EXISTS content_rollup (
+        date DATE NOT NULL,
+        platform platform_type NOT NULL,
+        subplatform VARCHAR(50) NOT NULL DEFAULT '',
+        language language_type NOT NULL,
+        n_posts BIGINT NOT NULL,
+        n_liwc BIGINT NOT NULL,
+        n_consp BIGINT NOT NULL,
+        n_v1 BIGINT NOT NULL,
+        n_v2_gr BIGINT NOT NULL,
+        n_v2_nwo BIGINT NOT NULL,
+        PRIMARY KEY (date, platform, subplatform, language)
+        );
+
+        -- latest content.updated_at and number of content deletes covered by the last refresh
+        CREATE TABLE IF NOT EXISTS rollup_state (
+        name VARCHAR(50) PRIMARY KEY,
+        refreshed_at TIMESTAMP NOT NULL,
+        n_deletes BIGINT NOT NULL DEFAULT 0
+        );
+
+        -- number of statements which deleted or truncated content rows, counted by the content_deleted trigger
+        CREATE TABLE IF NOT EXISTS content_deletes (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        n_deletes BIGINT NOT NULL DEFAULT 0
+        );"""
+        create_table(SQL_STATEMENT, cursor)
+        cursor.execute("""
+        ALTER TABLE rollup_state ADD COLUMN IF NOT EXISTS n_deletes BIGINT NOT NULL DEFAULT 0;
+        INSERT INTO content_deletes DEFAULT VALUES ON CONFLICT DO NOTHING;
+        """)
+        connection.commit()
+    except Exception as e:
+        print(f"Error creating Rollup Tables: {e}")
+        connection.rollback()  # Roll back on error
+
+    try:
+        cursor.execute("""
+        -- Recompute the rollup groups of all content rows created or updated since the last refresh (minus lookback,
+        -- to include rows of transactions which were still running during the last refresh) or all groups if full_refresh is set.
+        -- Deleted content is only removed from the rollup by a full refresh, which is done whenever content was deleted since the last refresh.
+        CREATE OR REPLACE FUNCTION refresh_content_rollup(full_refresh BOOLEAN DEFAULT FALSE, lookback INTERVAL DEFAULT '1 day')
+        RETURNS VOID AS $$
+        DECLARE
+            last_refresh TIMESTAMP;
+            last_deletes BIGINT;
+            covered_until TIMESTAMP;
+            deletes BIGINT;
+        BEGIN
+            -- the rollup covers at least the content visible before it is read, rows committed later are newer than
+            -- covered_until or change the number of deletes and make the rollup stale
+            SELECT COALESCE(max(updated_at), '-infinity') INTO covered_until FROM content;
+            SELECT n_deletes INTO deletes FROM content_deletes;
+            SELECT refreshed_at, n_deletes INTO last_refresh, last_deletes FROM rollup_state WHERE name = 'content_rollup';
+
+            IF full_refresh OR last_refresh IS NULL OR last_deletes IS DISTINCT FROM deletes THEN
+                TRUNCATE content_rollup;
+                INSERT INTO content_rollup
+                SELECT c.date, c.platform, COALESCE(c.subplatform, ''), c.language, COUNT(*), COUNT(c.label_liwc), COUNT(c.label_consp),
+                    COUNT(*) FILTER (WHERE l.v1_bin), COUNT(*) FILTER (WHERE l.v2_gr_bin), COUNT(*) FILTER (WHERE l.v2_nwo_bin)
+                FROM content c
+                LEFT JOIN labels_consp l ON l.id = c.label_consp
+                GROUP BY 1, 2, 3, 4;
+            ELSE
+                DELETE FROM content_rollup r
+                USING (SELECT DISTINCT date, platform, COALESCE(subplatform, '') AS subplatform, language
+                       FROM content WHERE updated_at >= last_refresh - lookback) g
+                WHERE r.date = g.date AND r.platform = g.platform AND r.subplatform = g.subplatform AND r.language = g.language;
+
+                INSERT INTO content_rollup
+                SELECT c.date, c.platform, COALESCE(c.subplatform, ''), c.language, COUNT(*), COUNT(c.label_liwc), COUNT(c.label_consp),
+                    COUNT(*) FILTER (WHERE l.v1_bin), COUNT(*) FILTER (WHERE l.v2_gr_bin), COUNT(*) FILTER (WHERE l.v2_nwo_bin)
+                FROM content c
+                JOIN (SELECT DISTINCT date, platform, COALESCE(subplatform, '') AS subplatform, language
+                      FROM content WHERE updated_at >= last_refresh - lookback) g
+                    ON c.date = g.date AND c.platform = g.platform AND COALESCE(c.subplatform, '') = g.subplatform AND c.language = g.language
+                LEFT JOIN labels_consp l ON l.id = c.label_consp
+                GROUP BY 1, 2, 3, 4;
+            END IF;
+
+            INSERT INTO rollup_state (name, refreshed_at, n_deletes) VALUES ('content_rollup', covered_until, deletes)
+            ON CONFLICT (name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at, n_deletes = EXCLUDED.n_deletes;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Trigger Function counting deletes of content rows, including those of the delete_content_cascade trigger
+        CREATE OR REPLACE FUNCTION count_content_delete()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE content_deletes SET n_deletes = n_deletes + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """)
+        connection.commit()
+    except Exception as e:
+        print(f"Error creating rollup refresh function: {e}")
+        connection.rollback()  # Roll back on error
+
+    create_content_delete_trigger(cursor, connection)
+
+def create_content_delete_trigger(cursor, connection):
+    # Statement-level, so a delete of many rows is counted once. Deletes and truncates of single partitions
+    # of a partitioned content table don't fire it (see purge_content_partition)
+    try:
+        cursor.execute("""
+        DROP TRIGGER IF EXISTS content_deleted ON content;
+        CREATE TRIGGER content_deleted
+        AFTER DELETE OR TRUNCATE ON content
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION count_content_delete();
+        """)
+        connection.commit()
+    except Exception as e:
+        print(f"Error creating content delete trigger: {e}")
+        connection.rollback()  # Roll back on error
+
+def refresh_rollup_tables(cursor, connection, full_refresh=False):
+    try:
+        cursor.execute("SELECT refresh_content_rollup(%s);", (full_refresh,))
+        connection.commit()
+    except Exception as e:
+        print(f"Error refreshing rollup tables: {e}")
+        connection.rollback()  # Roll back on error
+
+def create_author_index_table(cursor, connection):
+    try:
+        # normalized author name -> posts of all platforms (content_id refers to the platform table as in content)
+        SQL_STATEMENT = """CREATE TABLE IF NOT EXISTS author_index (
+        author_norm TEXT NOT NULL,
+        platform platform_type NOT NULL,
+        content_id BIGINT NOT NULL,
+        PRIMARY KEY (author_norm, platform, content_id)
+        );
+
+        CREATE INDEX IF NOT EXISTS author_index_content_idx ON author_index (platform, content_id);"""
+        create_table(SQL_STATEMENT, cursor)
+        connection.commit()
+    except Exception as e:
+        print(f"Error creating Author Index Table: {e}")
+        connection.rollback()  # Roll back on error
+
+    # index the posts already in the database, so that author filters also work on databases created before the index
+    try:
+        cursor.execute(f"""
+        INSERT INTO author_index (author_norm, platform, content_id)
+        {" UNION ALL ".join(AUTHOR_INDEX_SOURCES.values())}
+        ON CONFLICT DO NOTHING;
+        """)
+        connection.commit()
+    except Exception as e:
+        print(f"Error filling Author Index Table: {e}")
+        connection.rollback()  # Roll back on error
+
 def create_altnews_table(cursor, connection):
     try:
         SQL_STATEMENT = """CREATE TABLE alt_news (
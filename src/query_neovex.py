@@ -1,20 +1,419 @@
 from decouple import Config, RepositoryEnv
 import psycopg2 as pg
 from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import copy
+import hashlib
+import json
+import logging
 import pandas as pd
 import numpy as np
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
 import warnings
 
 
 warnings.simplefilter(action='ignore', category=UserWarning)
 
+logger = logging.getLogger(__name__)
+
+
+class NEOVEXConnectionPool:
+    def __init__(self, conn_dat, minconn=1, maxconn=8, health_check_interval=30):
+        """
+        Thread-safe pool of database connections shared between query wrappers. The underlying
+        psycopg2 pool is only opened on the first checkout.
+
+        :param conn_dat: Dictionary with the keys dbname, user, password, host and port
+        :param minconn: Number of connections kept open, default is 1
+        :param maxconn: Maximum number of simultaneously checked out connections, default is 8
+        :param health_check_interval: Seconds a connection may sit idle before it is checked with 'SELECT 1' on checkout, default is 30
+        """
+        self.conn_dat = conn_dat
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check_interval = health_check_interval
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self._stats = {
+            'checkouts': 0,
+            'wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'in_use': 0,
+            'health_checks': 0,
+            'reconnects': 0
+        }
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, **self.conn_dat)
+            return self._pool
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+            return True
+        with self._lock:
+            self._stats['health_checks'] += 1
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (pg.OperationalError, pg.InterfaceError):
+            return False
+
+    def _discard(self, conn):
+        pool = self._get_pool()
+        self._last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+        with self._lock:
+            self._stats['reconnects'] += 1
+        return pool.getconn()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of a with-block. Blocks while all connections are in use,
+        commits on success and rolls back on error before the connection is returned to the pool.
+
+        :return: psycopg2 connection
+        """
+        pool = self._get_pool()
+        start = time.perf_counter()
+        self._slots.acquire()
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['wait_time'] += waited
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], waited)
+
+        conn = None
+        try:
+            conn = pool.getconn()
+            if not self._is_healthy(conn):
+                conn = self._discard(conn)
+            try:
+                yield conn
+                if not conn.closed:
+                    conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+        finally:
+            if conn is not None:
+                if conn.closed:
+                    self._last_used.pop(id(conn), None)
+                    pool.putconn(conn, close=True)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                    pool.putconn(conn)
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    def run(self, func, retries=1):
+        """
+        Call func with a pooled connection. If the connection was lost during the call, it is replaced
+        and the call is repeated.
+
+        :param func: Callable taking a psycopg2 connection
+        :param retries: Number of reconnect attempts, default is 1
+        :return: Return value of func
+        """
+        for attempt in range(retries + 1):
+            with self.connection() as conn:
+                try:
+                    return func(conn)
+                except (pg.OperationalError, pg.InterfaceError):
+                    if not conn.closed or attempt == retries:
+                        raise
+            with self._lock:
+                self._stats['reconnects'] += 1
+
+    def get_stats(self):
+        """
+        Return usage statistics of the pool.
+
+        :return: python dictionary with checkouts, wait times, connections in use, idle connections, health checks and reconnects
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._pool._pool) if self._pool is not None else 0
+        stats['minconn'] = self.minconn
+        stats['maxconn'] = self.maxconn
+        return stats
+
+    def close(self):
+        """
+        Close all connections of the pool.
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._last_used = {}
+
+
+_connection_pools = {}
+_connection_pools_lock = threading.Lock()
+
+def get_connection_pool(conn_dat, minconn=1, maxconn=8):
+    """
+    Return the connection pool for the given connection details and pool sizes, creating it on first use.
+    Wrappers connecting to the same database with the same user and pool sizes share one pool.
+
+    :param conn_dat: Dictionary with the keys dbname, user, password, host and port
+    :param minconn: Number of connections kept open, default is 1
+    :param maxconn: Maximum number of simultaneously checked out connections, default is 8
+    :return: NEOVEXConnectionPool instance
+    """
+    key = (tuple(sorted(conn_dat.items())), minconn, maxconn)
+    with _connection_pools_lock:
+        if key not in _connection_pools:
+            _connection_pools[key] = NEOVEXConnectionPool(conn_dat, minconn=minconn, maxconn=maxconn)
+        return _connection_pools[key]
+
+
+CONTENT_COLUMNS = ["id", "date", "timestamp", "text", "text_prep", "title", "platform", "subplatform", "language",
+    "content_id", "label_liwc", "label_consp", "created_at", "updated_at"]
+
+# columns holding full texts, left out of results by set_exclude_text
+TEXT_COLUMNS = ["text", "text_prep", "title", "selftext"]
+
+# text search configurations used for the tsvector column of each content language
+TEXT_SEARCH_CONFIGS = {"eng": "english", "ger": "german"}
+
+class NEOVEXResultCache:
+    def __init__(self, cache_dir, max_bytes=2 * 2**30, watermark_query="SELECT max(updated_at), (SELECT n_deletes FROM content_deletes) FROM content", watermark_ttl=60):
+        """
+        On-disk cache of query results. Each result is stored as a parquet file named after the hash of the database
+        connection string and its SQL text, and an index.json file keeps track of size, data version and last access of 
+        all entries. Entries stored under an older data version are dropped on access; the least recently used entries 
+        are evicted once the cache grows beyond max_bytes.
+
+        :param cache_dir: Directory of the cache files
+        :param max_bytes: Maximum total size of the cached files, default is 2 GiB
+        :param watermark_query: Query returning a single row of values which change whenever the data changes, default is 
+        the latest content.updated_at (inserts and updates) and the number of deletes counted by the content_deleted trigger
+        :param watermark_ttl: Seconds for which a watermark is reused before it is queried again, default is 60
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.watermark_query = watermark_query
+        self.watermark_ttl = watermark_ttl
+        self.index_path = os.path.join(cache_dir, "index.json")
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # watermark and time it was queried per database connection string
+        self._watermarks = {}
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self._index = json.load(f)
+        else:
+            self._index = {}
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _key(self, query, dsn):
+        return hashlib.sha256(f"{dsn}\n{query}".encode("utf-8")).hexdigest()
+
+    def _remove(self, key):
+        entry = self._index.pop(key)
+        filepath = os.path.join(self.cache_dir, entry['file'])
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+    def get_watermark(self, conn):
+        """
+        Return the current data version of the database of a connection, querying it at most once per watermark_ttl seconds.
+
+        :param conn: psycopg2 connection
+        :return: Data version as string
+        """
+        with self._lock:
+            if conn.dsn in self._watermarks:
+                watermark, watermark_time = self._watermarks[conn.dsn]
+                if time.monotonic() - watermark_time < self.watermark_ttl:
+                    return watermark
+        with conn.cursor() as cursor:
+            cursor.execute(self.watermark_query)
+            watermark = "/".join(str(value) for value in cursor.fetchone())
+        with self._lock:
+            self._watermarks[conn.dsn] = (watermark, time.monotonic())
+        return watermark
+
+    def get(self, query, watermark, dsn=""):
+        """
+        Return the cached result of a query if it was stored under the given data version.
+
+        :param query: SQL text of the query
+        :param watermark: Current data version
+        :param dsn: Connection string of the database the query runs on (see get_watermark), default is ""
+        :return: Dataframe of query results or None
+        """
+        key = self._key(query, dsn)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if entry['watermark'] != watermark:
+                self._remove(key)
+                self._save_index()
+                self._stats['invalidations'] += 1
+                self._stats['misses'] += 1
+                return None
+            entry['last_access'] = time.time()
+            self._save_index()
+            self._stats['hits'] += 1
+            filepath = os.path.join(self.cache_dir, entry['file'])
+        return pd.read_parquet(filepath)
+
+    def put(self, query, watermark, dat, dsn=""):
+        """
+        Store the result of a query and evict least recently used entries if the cache is full.
+
+        :param query: SQL text of the query
+        :param watermark: Data version the result was queried at
+        :param dat: Dataframe of query results
+        :param dsn: Connection string of the database the query ran on, default is ""
+        """
+        key = self._key(query, dsn)
+        filename = f"{key}.parquet"
+        filepath = os.path.join(self.cache_dir, filename)
+        try:
+            dat.to_parquet(filepath, index=False)
+        except Exception as e:
+            logger.warning("Query result could not be cached: %s", e)
+            return
+
+        with self._lock:
+            self._index[key] = {
+                'file': filename,
+                'bytes': os.path.getsize(filepath),
+                'watermark': watermark,
+                'last_access': time.time()
+            }
+            total_bytes = sum(entry['bytes'] for entry in self._index.values())
+            for lru_key in sorted(self._index, key=lambda k: self._index[k]['last_access']):
+                if total_bytes <= self.max_bytes:
+                    break
+                total_bytes -= self._index[lru_key]['bytes']
+                self._remove(lru_key)
+                self._stats['evictions'] += 1
+            self._save_index()
+
+    def get_stats(self):
+        """
+        Return hit and miss statistics and the current size of the cache.
+
+        :return: python dictionary with hits, misses, invalidations, evictions, entries and bytes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._index)
+            stats['bytes'] = sum(entry['bytes'] for entry in self._index.values())
+        return stats
+
+    def clear(self):
+        """
+        Remove all cached results.
+        """
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+            self._save_index()
+
+
+_result_caches = {}
+
+def get_result_cache(cache_dir, max_bytes=2 * 2**30):
+    """
+    Return the result cache stored in the given directory, creating it on first use.
+
+    :param cache_dir: Directory of the cache files
+    :param max_bytes: Maximum total size of the cached files, default is 2 GiB
+    :return: NEOVEXResultCache instance
+    """
+    cache_dir = os.path.abspath(cache_dir)
+    with _connection_pools_lock:
+        if cache_dir not in _result_caches:
+            _result_caches[cache_dir] = NEOVEXResultCache(cache_dir, max_bytes=max_bytes)
+        return _result_caches[cache_dir]
+
+
+PLATFORM_TABLE_MAPPING = {
+    "alt_news": {"table": "alt_news", "fields": ["url", "author"]},
+    "legacy_news": {"table": "legacy_news", "fields": ["meta", "terms", "author", "url", "section", "article_id"]},
+    "4chan": {"table": "fourchan", "fields": ["media_link", "author", "nreplies", "num", "doc_id", "op", "poster_country", "referencing_comment", "searchterm", "subnum", "thread_id", "comments"]},
+    "reddit": {"table": "reddit", "fields": ["author", "post_id", "link_id", "parent_id", "searchterm" ,"selftext", "terms", "type", "url"]},
+    "twitter": {"table": "twitter", "fields": ["tweet_id", "ref", "refid", "author_id", "sampled"]}
+}
+
+LABEL_TABLE_MAPPING = {
+    "consp": {"table": "labels_consp", "fields": ["v1_bin", "v1_prob", "v2_gr_bin", "v2_gr_prob", "v2_nwo_bin", "v2_nwo_prob"]},
+    "liwc": {"table": "labels_liwc", "fields": ['bigwords', 'segment', 'wc', 'allnone', 'cause', 'certitude', 'cogproc', 
+           'differ', 'discrep', 'emo_anger', 'emo_anx', 'emo_neg', 'emo_pos', 
+           'emo_sad', 'emotion', 'insight', 'prep', 'tentat']}
+}
+
+# read queries, whose results are cached and whose plans are recorded by explain profiling;
+# other statements (e.g. DML passed as str_query) are always executed and only timed
+READ_QUERY_PATTERN = re.compile(r"\s*\(*\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+# notice with the plan of a statement logged by auto_explain in json format
+AUTO_EXPLAIN_NOTICE_PATTERN = re.compile(r"duration: ([\d.]+) ms\s+plan:\s*(\{.*\})", re.DOTALL)
+
+# enum-like content columns held as categoricals by compact results
+CATEGORY_COLUMNS = ["platform", "subplatform", "language"]
+
+# object columns with at most this share of distinct values are held as categoricals by compact results
+CATEGORY_MAX_SHARE = 0.5
+
+# arrow types of the postgres type oids used in the NEOVEX tables, all other types are exported as strings
+PG_ARROW_TYPES = {
+    16: "bool",
+    20: "int64",
+    21: "int16",
+    23: "int32",
+    700: "float32",
+    701: "float64",
+    1082: "date32",
+    1114: "timestamp[us]"
+}
 
 
 class NEOVEXQueryWrapper:
     def __init__(self, dbname, user, password, host, port=5432, 
     label_inclusion=None, label_exclusion=None, platform=None, subplatform=None,
     search_text = "all", string_match=None, case_sensitivity=False, language=None, 
-    daterange=None, author=None, merge_platform_data=False, merge_label_data=False):
+    daterange=None, author=None, merge_platform_data=False, merge_label_data=False, 
+    pool_minconn=1, pool_maxconn=8, cache=None):
         """
         Initialize the DatabaseWrapper with connection details.
 
@@ -35,6 +434,9 @@ class NEOVEXQueryWrapper:
         :param author: 
         :param merge_platform_data: 
         :param merge_label_data:
+        :param pool_minconn: Number of connections kept open by the shared connection pool, default is 1
+        :param pool_maxconn: Maximum number of connections of the shared connection pool, default is 8
+        :param cache: NEOVEXResultCache in which query results are cached, default is None (no caching)
         """
         self.conn_dat = {
             'dbname': dbname,
@@ -52,13 +454,26 @@ class NEOVEXQueryWrapper:
             'search_text' : "all",
             'case_sensitivity': case_sensitivity,
             'string_match': string_match,
+            'string_match_mode': "substring",
+            'string_match_logic': "any",
             'language': language,
             'daterange': daterange,
             'author': author,
             'merge_platform_data' : merge_platform_data,
-            'merge_label_data' : merge_platform_data
+            'merge_label_data' : merge_label_data,
+            'columns': None,
+            'exclude_text': False
         }
 
+        self.pool = get_connection_pool(self.conn_dat, minconn=pool_minconn, maxconn=pool_maxconn)
+        self.cache = cache
+        self.use_rollup = True
+        self.compact = False
+        self.profiling = False
+        self.profiling_explain = False
+        self.query_profile = []
+        self.query_hooks = []
+
         self.set_platform(platform)
         self.set_subplatform(subplatform)
 
@@ -104,7 +519,9 @@ class NEOVEXQueryWrapper:
     def set_search_text(self, search_text):
         """
         Set the search_text setting, which determines the columns which should be searched for a string match. 
-        Currently only "all", "text" or "title" are accepted. 
+        Currently only "all", "text" or "title" are accepted. Substring and regex matches search the raw text,
+        text_prep and title columns ("all"), text and text_prep ("text") or only title ("title"); full-text matches
+        search the title and text_prep (or text if there is no text_prep) parts of the text_tsv column.
 
         :param search_text: Search_text setting, default is "all"
         """
@@ -118,13 +535,23 @@ class NEOVEXQueryWrapper:
         """
         self.criteria['case_sensitivity'] = case_sensitivity
 
-    def set_string_match(self, match_string):
+    def set_string_match(self, match_string, mode="substring", match="any"):
         """
-        Set the string match for the query.
-
-        :param match_string: String to match in the text field
+        Set the string match for the query. In "substring" mode the string is matched as a substring (LIKE/ILIKE),
+        in "regex" mode as a POSIX regular expression (~/~*), both on the trigram-indexed columns of search_text.
+        In "fulltext" mode it is a web search style query (e.g. 'lizard "new world order" or chaos -covid') matched 
+        against the indexed tsvector of title and text using the English or German configuration of each post, 
+        and the results get a rank column.
+        A list of strings matches rows containing any or all of them in a single pass; the results then get a 
+        matched_terms column listing the terms found in each row.
+
+        :param match_string: String or list of strings to match in the text field
+        :param mode: Match mode, either "substring", "regex" or "fulltext", default is "substring"
+        :param match: For lists of strings, either "any" or "all", default is "any"
         """
         self.criteria['string_match'] = match_string
+        self.criteria['string_match_mode'] = mode
+        self.criteria['string_match_logic'] = match
 
     def set_language(self, language):
         """
@@ -145,10 +572,13 @@ class NEOVEXQueryWrapper:
 
     def set_author(self, author):
         """
-        Set the author for the query.
+        Set the author(s) for the query. Author names are matched case-insensitively on all platforms 
+        (twitter posts by username).
 
-        :param author: Author name
+        :param author: Author name or list of author names
         """
+        if isinstance(author, str):
+            author = [author]
         self.criteria['author'] = author
     
     def set_merge_platform_data(self, merge_bool):
@@ -169,6 +599,27 @@ class NEOVEXQueryWrapper:
         """
         self.criteria['merge_label_data'] = merge_bool
 
+    def set_columns(self, columns):
+        """
+        Set the columns included in the query results, e.g. ["date", "platform", "emo_anger"]. Columns can be 
+        content columns or fields of the platform and label tables; the latter are only included if 
+        merge_platform_data or merge_label_data is set. Per default ("None") all columns are included.
+
+        :param columns: Column name or list of column names
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        self.criteria['columns'] = columns
+
+    def set_exclude_text(self, exclude_bool):
+        """
+        Set the exclude_text setting. If true, the text columns (text, text_prep, title and the reddit selftext)
+        are left out of the query results.
+
+        :param exclude_bool: exclude_text setting, default is False
+        """
+        self.criteria['exclude_text'] = exclude_bool
+
     def get_criteria(self):
         """
         Return currently specified criteria.
@@ -177,6 +628,58 @@ class NEOVEXQueryWrapper:
         """
         print(self.criteria)
 
+    def set_criteria(self, **criteria):
+        """
+        Set several criteria at once, e.g. set_criteria(platform="reddit", daterange=("2020-08-01", "2020-08-31")).
+        Keys are the keys of the criteria dictionary (see get_criteria).
+
+        :param criteria: Criteria names and values
+        """
+        for key, value in criteria.items():
+            assert key in self.criteria
+            if key == 'daterange' and value:
+                self.set_daterange(*value)
+            elif key in ['label_inclusion', 'label_exclusion', 'platform', 'author', 'columns']:
+                getattr(self, f"set_{key}")(value)
+            else:
+                self.criteria[key] = value
+
+    def copy(self, **criteria):
+        """
+        Return a copy of the wrapper with its own criteria, sharing the connection pool and result cache.
+
+        :param criteria: Criteria to change in the copy (see set_criteria)
+        :return: NEOVEXQueryWrapper instance
+        """
+        wrapper = copy.copy(self)
+        wrapper.criteria = copy.deepcopy(self.criteria)
+        wrapper.set_criteria(**criteria)
+        return wrapper
+
+    def get_pool_stats(self):
+        """
+        Return usage statistics of the connection pool shared by this wrapper.
+
+        :return: python dictionary of pool statistics
+        """
+        return self.pool.get_stats()
+
+    def set_cache(self, cache):
+        """
+        Set the result cache of the wrapper. Results of read queries (SELECT or WITH) are then stored on disk
+        and reused until the data in the database changes; other statements always run on the database.
+
+        :param cache: NEOVEXResultCache instance or None to disable caching
+        """
+        self.cache = cache
+
+    def get_cache_stats(self):
+        """
+        Return hit and miss statistics of the result cache used by this wrapper.
+
+        :return: python dictionary of cache statistics
+        """
+        return self.cache.get_stats() if self.cache else None
 
     def query_db(self, sql_query=None, str_query=None):
         """
@@ -187,32 +690,567 @@ class NEOVEXQueryWrapper:
 
         :return: Dataframe of query results
         """
-        if sql_query:
-            with pg.connect("host='{}' port={} dbname='{}' user={} password={}".format(self.conn_dat['host'], self.conn_dat['port'], self.conn_dat['dbname'], self.conn_dat['user'], self.conn_dat['password'])) as conn:
-                dat = pd.read_sql_query(sql_query.as_string(conn), conn)
-        elif str_query:
-            with pg.connect("host='{}' port={} dbname='{}' user={} password={}".format(self.conn_dat['host'], self.conn_dat['port'], self.conn_dat['dbname'], self.conn_dat['user'], self.conn_dat['password'])) as conn:
-                dat = pd.read_sql_query(str_query, conn)
-        clean_dat = (
-            dat.T
-            .groupby(level=0)  # Group by original column names
-            .agg(lambda group: group.dropna().iloc[0] if not group.dropna().empty else np.nan)  # Handle NaN values explicitly
-            .T  # Transpose back to the original orientation
-        )
+        def run_query(conn):
+            record = {'cache_hit': False}
+            stage_start = time.perf_counter()
+
+            def end_stage(stage):
+                nonlocal stage_start
+                stage_end = time.perf_counter()
+                record[f"{stage}_time"] = stage_end - stage_start
+                stage_start = stage_end
+
+            query = sql_query.as_string(conn) if sql_query else str_query
+            end_stage("render")
+            read_query = READ_QUERY_PATTERN.match(query) is not None
+            cache = self.cache if read_query else None
+            if cache:
+                watermark = cache.get_watermark(conn)
+                dat = cache.get(query, watermark, dsn=conn.dsn)
+                end_stage("cache")
+                if dat is not None:
+                    record['cache_hit'] = True
+                    self.record_query(conn, query, record, dat)
+                    return dat
+
+            explain = self.profiling_explain and read_query
+            auto_explained = explain and self.start_auto_explain(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(query)
+                end_stage("execute")
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                rows = cursor.fetchall() if cursor.description else []
+                end_stage("fetch")
+            dat = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+            end_stage("dataframe")
+            dat = self.clean_result(dat)
+            end_stage("clean")
+
+            if cache:
+                cache.put(query, watermark, dat, dsn=conn.dsn)
+            if explain:
+                record.update(self.get_query_plan(conn, query, auto_explained))
+            self.record_query(conn, query, record, dat)
+            return dat
+
+        dat = self.pool.run(run_query)
+        return self.compact_result(dat) if self.compact else dat
+
+    def set_compact(self, compact):
+        """
+        Set the compact setting. If true, results are returned with memory-saving dtypes (see compact_result). 
+        The default is False.
 
-        return pd.DataFrame(clean_dat)
-    
+        :param compact: compact setting
+        """
+        self.compact = compact
+
+    def compact_result(self, dat):
+        """
+        Convert a query result to memory-saving dtypes: platform, subplatform, language and other string columns 
+        with few distinct values become categoricals, the remaining strings Arrow-backed strings, label scores float32
+        and integers the smallest integer type holding their values.
+
+        :param dat: Dataframe of query results
+        :return: Dataframe of query results
+        """
+        label_fields = {field for table_info in LABEL_TABLE_MAPPING.values() for field in table_info["fields"]}
+        compacted = {}
+        for column in dat.columns:
+            values = dat[column]
+            kind = pd.api.types.infer_dtype(values, skipna=True)
+            if values.dtype == object and kind in ["integer", "floating", "mixed-integer-float", "decimal"]:
+                values = pd.to_numeric(values)
+
+            if column in CATEGORY_COLUMNS:
+                values = values.astype("category")
+            elif kind == "string":
+                if column not in TEXT_COLUMNS and values.nunique() <= CATEGORY_MAX_SHARE * len(values):
+                    values = values.astype("category")
+                else:
+                    values = values.astype("string[pyarrow]")
+            elif pd.api.types.is_float_dtype(values) and column in label_fields:
+                values = values.astype("float32")
+            elif pd.api.types.is_integer_dtype(values):
+                values = pd.to_numeric(values, downcast="integer")
+            compacted[column] = values
+
+        return pd.DataFrame(compacted, index=dat.index)
+
+    def set_profiling(self, profiling, explain=False):
+        """
+        Set the profiling setting. If true, a record of every query run through query_db is added to the query profile 
+        (see get_query_profile), holding the SQL, the number of rows, the size of the result and the client-side time of
+        each stage (render, cache, execute, fetch, dataframe, clean). Records are shared by all copies of the wrapper.
+
+        :param profiling: Profiling setting, default is False
+        :param explain: If true, the plan of each SELECT query is added to the record, default is False. Queries are not run
+        a second time: if the server allows loading auto_explain (usually only for superusers), the plan with actual rows,
+        timings and buffers is logged by the server during the query run itself, and the server execution time and number
+        of bytes transferred are taken from that run. Otherwise the plan is the planner's estimate (EXPLAIN without ANALYZE),
+        the server execution time is None and the bytes transferred are estimated. Other statements are not explained.
+        """
+        self.profiling = profiling
+        self.profiling_explain = explain
+
+    def add_query_hook(self, hook):
+        """
+        Add a callback which is called with the profiling record (see set_profiling) of every query run through query_db, 
+        e.g. to log queries. Hooks are called whether or not profiling is set.
+
+        :param hook: Callable taking a python dictionary
+        """
+        self.query_hooks.append(hook)
+
+    def record_query(self, conn, query, record, dat):
+        """
+        Complete the profiling record of a query, add it to the query profile and pass it to the query hooks.
+
+        :param conn: psycopg2 connection the query was run on
+        :param query: SQL text of the query
+        :param record: python dictionary with cache_hit and stage timings
+        :param dat: Dataframe of query results
+        """
+        if not self.profiling and not self.query_hooks:
+            return
+
+        record['timestamp'] = time.time()
+        record['sql'] = query
+        record['rows'] = len(dat)
+        record['result_bytes'] = int(dat.memory_usage(deep=True).sum())
+        record['total_time'] = sum(value for key, value in record.items() if key.endswith("_time"))
+
+        if self.profiling:
+            self.query_profile.append(record)
+        for hook in self.query_hooks:
+            hook(record)
+
+    def start_auto_explain(self, conn):
+        """
+        Make the server send the plan of the statements run in the rest of the current transaction to the client as
+        notices, using auto_explain with actual rows, timings and buffers.
+
+        :param conn: psycopg2 connection
+        :return: True if auto_explain could be loaded and set up
+        """
+        with conn.cursor() as cursor:
+            cursor.execute("SAVEPOINT auto_explain;")
+            try:
+                cursor.execute("""
+                LOAD 'auto_explain';
+                SET LOCAL auto_explain.log_min_duration = 0;
+                SET LOCAL auto_explain.log_analyze = on;
+                SET LOCAL auto_explain.log_buffers = on;
+                SET LOCAL auto_explain.log_format = 'json';
+                SET LOCAL client_min_messages = 'log';
+                """)
+            except pg.Error:
+                cursor.execute("ROLLBACK TO SAVEPOINT auto_explain;")
+                return False
+            cursor.execute("RELEASE SAVEPOINT auto_explain;")
+        del conn.notices[:]
+        return True
+
+    def get_query_plan(self, conn, query, auto_explained):
+        """
+        Return the plan of a query for its profiling record, from the notice logged by auto_explain during its run or,
+        without auto_explain, from the planner's estimate.
+
+        :param conn: psycopg2 connection the query was run on
+        :param query: SQL text of the query
+        :param auto_explained: Whether auto_explain was set up for the run of the query (see start_auto_explain)
+        :return: python dictionary with plan, plan_analyzed, execution_time_server and transfer_bytes
+        """
+        if auto_explained:
+            for notice in reversed(conn.notices):
+                match = AUTO_EXPLAIN_NOTICE_PATTERN.search(notice)
+                if match:
+                    plan = json.loads(match.group(2))['Plan']
+                    return {
+                        'plan': plan,
+                        'plan_analyzed': True,
+                        'execution_time_server': float(match.group(1)) / 1000,
+                        'transfer_bytes': int(plan['Actual Rows'] * plan['Actual Loops'] * plan['Plan Width'])
+                    }
+
+        with conn.cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query)
+            plan = cursor.fetchone()[0][0]['Plan']
+        return {
+            'plan': plan,
+            'plan_analyzed': False,
+            'execution_time_server': None,
+            'transfer_bytes': int(plan['Plan Rows'] * plan['Plan Width'])
+        }
+
+    def get_query_profile(self):
+        """
+        Return the profiling records collected so far (see set_profiling).
+
+        :return: Dataframe with one row per query
+        """
+        return pd.DataFrame(self.query_profile)
+
+    def clean_result(self, dat):
+        """
+        Merge columns with duplicate names in a query result (e.g. from custom queries joining several tables)
+        by taking the first non-null value per row. Columns without duplicates keep their dtypes.
+
+        :param dat: Dataframe of raw query results
+        :return: Dataframe of query results
+        """
+        duplicated = dat.columns.duplicated(keep=False)
+        if not duplicated.any():
+            return dat
+
+        merged_columns = []
+        for column in dict.fromkeys(dat.columns):
+            positions = np.flatnonzero(dat.columns == column)
+            merged = dat.iloc[:, positions[0]]
+            for position in positions[1:]:
+                merged = merged.combine_first(dat.iloc[:, position])
+            merged_columns.append(merged.rename(column))
+
+        return pd.concat(merged_columns, axis=1)
+
+    def iter_query(self, chunk_rows=10000):
+        """
+        Execute the constructed query on a server-side cursor and yield the results in chunks,
+        so that only chunk_rows rows are held in memory at a time. The criteria are checked right away,
+        the query runs once the first chunk is requested.
+
+        :param chunk_rows: Maximum number of rows per chunk, default is 10000
+        :return: Generator of Dataframes of query results
+        """
+        self.check_query()
+        return self._iter_results(self.build_base_query(), chunk_rows)
+
+    def _iter_results(self, query, chunk_rows):
+        with self.pool.connection() as conn:
+            with conn.cursor(name=f"neovex_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = chunk_rows
+                cursor.execute(query)
+                columns = None
+                while True:
+                    rows = cursor.fetchmany(chunk_rows)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [desc[0] for desc in cursor.description]
+                    dat = self.clean_result(pd.DataFrame.from_records(rows, columns=columns))
+                    yield self.compact_result(dat) if self.compact else dat
     
-    def execute_query(self):
+    def execute_query(self, stream=False, chunk_rows=10000, parallel=None):
         """
         Execute the constructed query and fetch all results.
 
+        :param stream: If true, return a generator of result chunks instead of a single Dataframe (see iter_query), default is False
+        :param chunk_rows: Maximum number of rows per chunk when streaming, default is 10000
+        :param parallel: Number of shards (see get_shards) queried at the same time on separate connections, default is None (single query)
         :return: Dataframe of query results
         """
+        if stream:
+            assert not parallel
+            return self.iter_query(chunk_rows=chunk_rows)
         self.check_query()
+        fulltext = self.criteria['string_match'] and self.criteria['string_match_mode'] == "fulltext"
+
+        if parallel and parallel > 1:
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                results = list(executor.map(lambda shard: shard.execute_query(), self.get_shards(parallel)))
+            dat = pd.concat(results, ignore_index=True)
+            if fulltext:
+                dat = dat.sort_values("rank", ascending=False, kind="stable", ignore_index=True)
+            # categories of the shards differ, so concatenated categoricals fall back to object columns
+            return self.compact_result(dat) if self.compact else dat
+
         query = self.build_base_query()
+        if fulltext:
+            query += sql.SQL(" ORDER BY rank DESC")
         return self.query_db(sql_query=query)
 
+    def page(self, after=None, size=100):
+        """
+        Return one page of the query results ordered by date and id. Pages are selected with a keyset condition
+        '(date, id) > (last date, last id)' instead of OFFSET, so every page costs the same and can use the (date, id) index.
+
+        :param after: Continuation token returned with the previous page, default is None (first page)
+        :param size: Number of rows per page, default is 100
+        :return: Tuple of Dataframe of query results and continuation token of the next page (None after the last page)
+        """
+        self.check_query()
+        wrapper = self
+        if self.criteria['columns'] and not {'date', 'id'} <= set(self.criteria['columns']):
+            wrapper = self.copy(columns=self.criteria['columns'] + [column for column in ['date', 'id'] if column not in self.criteria['columns']])
+        query = wrapper.build_base_query()
+        if after:
+            last_date, last_id = json.loads(base64.urlsafe_b64decode(after.encode("ascii")))
+            query += sql.SQL(" AND (content.date, content.id) > ({}::date, {})").format(sql.Literal(last_date), sql.Literal(last_id))
+        query += sql.SQL(" ORDER BY content.date, content.id LIMIT {}").format(sql.Literal(size))
+        dat = self.query_db(sql_query=query)
+
+        if len(dat) < size:
+            return dat, None
+        last_row = dat.iloc[-1]
+        token = base64.urlsafe_b64encode(json.dumps([str(last_row['date']), int(last_row['id'])]).encode("utf-8")).decode("ascii")
+        return dat, token
+
+    def estimate_rows(self):
+        """
+        Return the planner's estimate of the number of rows matching the criteria, without running the query.
+
+        :return: Estimated number of rows
+        """
+        query = self.build_base_query(custom_select=sql.SQL("SELECT 1"))
+
+        def run_explain(conn):
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("EXPLAIN (FORMAT JSON) {}").format(query))
+                return cursor.fetchone()[0][0]['Plan']['Plan Rows']
+
+        return self.pool.run(run_explain)
+
+    def sample(self, n=None, fraction=None, stratify_by=None, seed=None, method="system"):
+        """
+        Draw a random sample of the posts matching the criteria. The content table is sampled with TABLESAMPLE 
+        (SYSTEM samples whole pages and is fastest, BERNOULLI samples single rows), and at most n rows per stratum
+        are kept, ordered by a hash of post id and seed. The same seed yields the same sample as long as the table 
+        is unchanged.
+        If only n is given, the sampled fraction is derived from the planner's row estimate (unstratified) or from 
+        the smallest stratum in the content_rollup table (stratified by rollup columns), and it is quadrupled until
+        the sample holds n rows (per stratum) or the whole table is read; otherwise all matching rows are ranked.
+
+        :param n: Maximum number of rows (per stratum if stratify_by is set), default is None
+        :param fraction: Fraction of the table to sample between 0 and 1, default is None
+        :param stratify_by: Content column name or list of content column names, e.g. ["platform", "language"], default is None
+        :param seed: Seed of the sample, default is None (random seed, stored in the attrs of the result)
+        :param method: Sampling method, either "system" or "bernoulli", default is "system"
+        :return: Dataframe of sampled posts
+        """
+        assert n is not None or fraction is not None
+        assert method in ["system", "bernoulli"]
+        if isinstance(stratify_by, str):
+            stratify_by = [stratify_by]
+        stratify_by = stratify_by or []
+        for column in stratify_by:
+            assert column in CONTENT_COLUMNS
+        if seed is None:
+            seed = random.randint(0, 2**31 - 1)
+        self.check_query()
+
+        # sample about three times the needed rows, as pages sampled by SYSTEM hold clusters of similar posts
+        oversampling = 3
+        # number of rows expected if the fraction is derived from n, fewer rows are sampled again with a larger fraction
+        required_rows = None
+        if fraction is None:
+            if not stratify_by:
+                fraction = n * oversampling / max(self.estimate_rows(), 1)
+                required_rows = n
+            elif self.get_rollup_count(stratify_by) is not None:
+                stratum_counts = self.sum_rows(group_by=stratify_by)['count']
+                if len(stratum_counts) > 0:
+                    fraction = n * oversampling / max(stratum_counts.min(), 1)
+                    required_rows = int(np.minimum(stratum_counts, n).sum())
+
+        partition_clause = sql.SQL("")
+        if stratify_by:
+            partition_clause = sql.SQL("PARTITION BY {} ").format(
+                sql.SQL(", ").join(sql.SQL("content.{}").format(sql.Identifier(column)) for column in stratify_by)
+            )
+        sample_rank = sql.SQL("row_number() OVER ({}ORDER BY md5(content.id::text || {})) AS sample_rank").format(
+            partition_clause, sql.Literal(str(seed))
+        )
+
+        while True:
+            tablesample = None
+            if fraction is not None and fraction < 1:
+                tablesample = sql.SQL("TABLESAMPLE {} ({}) REPEATABLE ({})").format(
+                    sql.SQL(method.upper()), sql.Literal(float(fraction) * 100), sql.Literal(seed)
+                )
+
+            query = self.build_base_query(extra_fields=[sample_rank], tablesample=tablesample)
+            if n is not None:
+                query = sql.SQL("SELECT * FROM ({}) AS sample WHERE sample_rank <= {}").format(query, sql.Literal(n))
+
+            dat = self.query_db(sql_query=query).drop(columns="sample_rank")
+            # few sampled pages (SYSTEM) or rows (BERNOULLI) of a small table often hold fewer rows than needed or none;
+            # the last attempt reads the whole table
+            if tablesample is None or required_rows is None or len(dat) >= required_rows:
+                break
+            fraction *= 4
+
+        dat.attrs['seed'] = seed
+        return dat
+
+    def get_shards(self, parallel):
+        """
+        Split the query into shards which can be run independently and return the same columns as the query.
+        If a date range is set, it is split into up to parallel consecutive date ranges. Otherwise the query is split
+        into one shard per platform, unless merged platform data would give the shards different columns; then the
+        date range of the matching posts is split instead.
+
+        :param parallel: Number of date range shards
+        :return: List of NEOVEXQueryWrapper copies in a fixed order
+        """
+        daterange = self.criteria['daterange']
+        if not daterange:
+            platforms = self.criteria['platform'] or list(PLATFORM_TABLE_MAPPING)
+            # without a platform criterion, merged queries join no platform table but platform shards would
+            if not self.criteria['merge_platform_data'] or (
+                self.criteria['platform'] and all(self.get_platform_columns(platform) == self.get_platform_columns(platforms[0]) for platform in platforms)
+            ):
+                return [self.copy(platform=[platform]) for platform in platforms]
+            dates = self.query_db(sql_query=self.build_base_query(
+                custom_select=sql.SQL("SELECT min(content.date) AS start_date, max(content.date) AS end_date")
+            ))
+            if dates['start_date'].isna().all():
+                return [self]
+            daterange = (dates['start_date'][0], dates['end_date'][0])
+
+        start_date, end_date = (pd.Timestamp(date) for date in daterange)
+        bounds = np.unique(np.linspace(0, (end_date - start_date).days + 1, parallel + 1).astype(int))
+        return [
+            self.copy(daterange=(
+                (start_date + pd.Timedelta(days=int(lower))).strftime('%Y-%m-%d'),
+                (start_date + pd.Timedelta(days=int(upper) - 1)).strftime('%Y-%m-%d')
+            ))
+            for lower, upper in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def get_platform_columns(self, platform):
+        """
+        Return the selected columns which the table of a platform adds to the query if platform data is merged.
+
+        :param platform: Platform name
+        :return: List of column names
+        """
+        columns = [field for field in PLATFORM_TABLE_MAPPING[platform]["fields"] if self.is_selected_column(field)]
+        if platform == 'twitter' and self.is_selected_column('author'):
+            columns.append('author')
+        return columns
+
+    def export(self, path, format="parquet", chunk_bytes=64 * 2**20, parallel=None):
+        """
+        Export the results of the constructed query to a file. The query is wrapped in 'COPY (...) TO STDOUT',
+        and its output is written to disk as it arrives, without building a Dataframe. Parquet files get one
+        row group and arrow files one record batch per chunk_bytes of CSV read.
+
+        :param path: Filepath of the output file
+        :param format: Output format, either "parquet", "csv" or "arrow", default is "parquet"
+        :param chunk_bytes: Number of bytes of COPY output converted at a time, default is 64 MiB
+        :param parallel: Number of shards (see get_shards) exported at the same time on separate connections, default is None (single query)
+        """
+        assert format in ["parquet", "csv", "arrow"]
+        self.check_query()
+        if parallel and parallel > 1:
+            self.export_shards(path, format, chunk_bytes, parallel)
+            return
+        query = self.build_base_query()
+
+        if format == "csv":
+            def run_export(conn):
+                copy_query = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER true)").format(query)
+                with open(path, "wb") as file, conn.cursor() as cursor:
+                    cursor.copy_expert(copy_query.as_string(conn), file)
+
+            self.pool.run(run_export)
+            return
+
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Exporting to parquet or arrow requires pyarrow (pip install pyarrow).")
+
+        def run_export(conn):
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("SELECT * FROM ({}) AS export_query LIMIT 0").format(query))
+                columns = [(desc[0], pa.type_for_alias(PG_ARROW_TYPES.get(desc[1], "string"))) for desc in cursor.description]
+            copy_query = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv)").format(query).as_string(conn)
+
+            read_fd, write_fd = os.pipe()
+
+            def copy_out():
+                with os.fdopen(write_fd, "wb") as sink, conn.cursor() as cursor:
+                    cursor.copy_expert(copy_query, sink)
+
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                copy_future = executor.submit(copy_out)
+                with os.fdopen(read_fd, "rb") as source:
+                    # the file is written with the column schema of the query, so that an empty result gives an empty file
+                    schema = pa.schema(columns)
+                    if format == "parquet":
+                        writer = pq.ParquetWriter(path, schema)
+                    else:
+                        writer = pa.ipc.new_file(path, schema)
+                    with writer:
+                        # pyarrow cannot open an empty CSV stream
+                        if source.peek(1):
+                            reader = pa_csv.open_csv(
+                                source,
+                                read_options=pa_csv.ReadOptions(column_names=schema.names, block_size=chunk_bytes),
+                                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                                convert_options=pa_csv.ConvertOptions(
+                                    column_types=dict(columns),
+                                    true_values=["t"],
+                                    false_values=["f"],
+                                    null_values=[""],
+                                    strings_can_be_null=True,
+                                    quoted_strings_can_be_null=False
+                                )
+                            )
+                            for batch in reader:
+                                writer.write_batch(batch)
+                copy_future.result()
+
+        self.pool.run(run_export)
+
+    def export_shards(self, path, format, chunk_bytes, parallel):
+        """
+        Export the shards of the query to temporary files at the same time and append them to the output file in shard order.
+
+        :param path: Filepath of the output file
+        :param format: Output format, either "parquet", "csv" or "arrow"
+        :param chunk_bytes: Number of bytes of COPY output converted at a time
+        :param parallel: Number of shards exported at the same time
+        """
+        shards = self.get_shards(parallel)
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as tmp_dir:
+            shard_paths = [os.path.join(tmp_dir, f"shard_{i}.{format}") for i in range(len(shards))]
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                list(executor.map(lambda args: args[0].export(args[1], format=format, chunk_bytes=chunk_bytes), zip(shards, shard_paths)))
+
+            if format == "csv":
+                with open(path, "wb") as file:
+                    for i, shard_path in enumerate(shard_paths):
+                        with open(shard_path, "rb") as shard_file:
+                            header = shard_file.readline()
+                            if i == 0:
+                                file.write(header)
+                            shutil.copyfileobj(shard_file, file)
+                return
+
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if format == "parquet":
+                schema = pq.read_schema(shard_paths[0])
+                with pq.ParquetWriter(path, schema) as writer:
+                    for shard_path in shard_paths:
+                        shard_file = pq.ParquetFile(shard_path)
+                        for row_group in range(shard_file.num_row_groups):
+                            writer.write_table(shard_file.read_row_group(row_group))
+            else:
+                with pa.memory_map(shard_paths[0]) as source:
+                    schema = pa.ipc.open_file(source).schema
+                with pa.ipc.new_file(path, schema) as writer:
+                    for shard_path in shard_paths:
+                        with pa.memory_map(shard_path) as source:
+                            reader = pa.ipc.open_file(source)
+                            for batch in range(reader.num_record_batches):
+                                writer.write_batch(reader.get_batch(batch))
+
 
     def check_query(self):
         """
@@ -220,7 +1258,7 @@ class NEOVEXQueryWrapper:
         """
 
         if self.criteria['platform']:
-            allowed_platforms = ["alt_news","legacy_news","4chan", "reddit","twitter"]
+            allowed_platforms = list(PLATFORM_TABLE_MAPPING)
             if len(self.criteria['platform']) == 1:
                 assert self.criteria['platform'][0] in allowed_platforms
             elif len(self.criteria['platform']) > 1:
@@ -237,13 +1275,30 @@ class NEOVEXQueryWrapper:
         
         if self.criteria['string_match']:
             assert self.criteria['search_text'] in ['all', 'text', 'title']
+            assert self.criteria['string_match_mode'] in ['substring', 'regex', 'fulltext']
+            assert self.criteria['string_match_logic'] in ['any', 'all']
 
         assert type(self.criteria['case_sensitivity']) == bool
 
-    def build_base_query(self, custom_select=None):
+        if self.criteria['columns']:
+            known_columns = set(CONTENT_COLUMNS)
+            for table_info in list(PLATFORM_TABLE_MAPPING.values()) + list(LABEL_TABLE_MAPPING.values()):
+                known_columns.update(table_info["fields"])
+            for column in self.criteria['columns']:
+                assert column in known_columns, f"Unknown column '{column}'"
+            _, selected_fields = self.add_platform_and_label_query()
+            assert selected_fields, (
+                f"None of the columns {self.criteria['columns']} belongs to a table of the query, "
+                "check set_exclude_text and the platforms and labels set with merge_platform_data and merge_label_data"
+            )
+
+    def build_base_query(self, custom_select=None, extra_fields=None, tablesample=None):
         """
         Build the base SQL query based on the set criteria, including platform-specific and label-specific information if required.
 
+        :param custom_select: SQL select clause replacing the selected fields, default is None
+        :param extra_fields: List of SQL fields selected in addition to the selected fields, default is None
+        :param tablesample: SQL tablesample clause applied to the content table, default is None
         :return: Constructed SQL query
         """
         join_clauses, selected_fields = self.add_platform_and_label_query()
@@ -251,187 +1306,323 @@ class NEOVEXQueryWrapper:
         if custom_select:
             select_clause = custom_select
         else:
+            if self.criteria['string_match'] and self.criteria['string_match_mode'] == "fulltext":
+                selected_fields.append(sql.SQL("ts_rank(content.text_tsv, {}) AS rank").format(self.get_tsquery()))
+            elif isinstance(self.criteria['string_match'], list):
+                selected_fields.append(self.get_matched_terms_field())
+            if extra_fields:
+                selected_fields.extend(extra_fields)
             select_clause = sql.SQL("SELECT {}").format(sql.SQL(", ").join(selected_fields))
             
         from_clause = sql.SQL("FROM content")
+        if tablesample:
+            from_clause += sql.SQL(" ") + tablesample
+
+        where_clause = self.build_where_clause()
+
+        full_query = select_clause + sql.SQL(" ") + from_clause
+        if join_clauses:
+            full_query += sql.SQL(" ").join(join_clauses)
+
+        full_query += where_clause
+
+        return full_query
 
+    def build_where_clause(self):
+        """
+        Build the where clause of the SQL query based on the set criteria. All columns are referenced as content.<column>.
+
+        :return: Constructed SQL where clause
+        """
         where_clause = sql.SQL(" WHERE 1=1")
 
         if self.criteria['label_inclusion']:
             if len(self.criteria['label_inclusion']) == 1:
-                where_clause += sql.SQL(" AND {} IS NOT NULL").format(sql.Identifier(f"label_{self.criteria['label_inclusion'][0]}"))
+                where_clause += sql.SQL(" AND content.{} IS NOT NULL").format(sql.Identifier(f"label_{self.criteria['label_inclusion'][0]}"))
             else:
                 for label in self.criteria['label_inclusion']:
                     column_name = f"label_{label}"
-                    where_clause += sql.SQL(" AND {} IS NOT NULL").format(sql.Identifier(column_name))
+                    where_clause += sql.SQL(" AND content.{} IS NOT NULL").format(sql.Identifier(column_name))
         if self.criteria['label_exclusion']:
             if len(self.criteria['label_exclusion']) == 1:
-                where_clause += sql.SQL(" AND {} IS NULL").format(sql.Identifier(f"label_{self.criteria['label_exclusion'][0]}"))
+                where_clause += sql.SQL(" AND content.{} IS NULL").format(sql.Identifier(f"label_{self.criteria['label_exclusion'][0]}"))
             else:
                 for label in self.criteria['label_exclusion']:
                     column_name = f"label_{label}"
-                    where_clause += sql.SQL(" AND {} IS NULL").format(sql.Identifier(column_name))
+                    where_clause += sql.SQL(" AND content.{} IS NULL").format(sql.Identifier(column_name))
         if self.criteria['platform']:
             if len(self.criteria['platform']) == 1:
-                where_clause += sql.SQL(" AND platform = {}").format(sql.Literal(self.criteria['platform'][0]))
+                where_clause += sql.SQL(" AND content.platform = {}").format(sql.Literal(self.criteria['platform'][0]))
             else:
-                where_clause += sql.SQL(" AND platform IN ({})").format(
+                where_clause += sql.SQL(" AND content.platform IN ({})").format(
                     sql.SQL(',').join(map(sql.Literal, self.criteria['platform']))
                 )
         if self.criteria['subplatform']:
             if len(self.criteria['subplatform']) == 1:
-                where_clause += sql.SQL(" AND subplatform = {}").format(sql.Literal(self.criteria['subplatform'][0]))
+                where_clause += sql.SQL(" AND content.subplatform = {}").format(sql.Literal(self.criteria['subplatform'][0]))
             else:
-                where_clause += sql.SQL(" AND subplatform IN ({})").format(
+                where_clause += sql.SQL(" AND content.subplatform IN ({})").format(
                     sql.SQL(',').join(map(sql.Literal, self.criteria['subplatform']))
                 )
-        if self.criteria['string_match']:
-            string_match = self.criteria['string_match']
-            match_operator = "LIKE" if self.criteria['case_sensitivity'] else "ILIKE"
-            if self.criteria['search_text'] == "all":
-                where_clause += sql.SQL(f" AND (text {match_operator} {{}} OR text_prep {match_operator} {{}} OR title {match_operator} {{}})").format(
-                    sql.Literal(f"%{string_match}%"),
-                    sql.Literal(f"%{string_match}%"),
-                    sql.Literal(f"%{string_match}%")
-                )
-            elif self.criteria['search_text'] == "title":
-                where_clause += sql.SQL(f" AND title {match_operator} {{}}").format(sql.Literal(f"%{string_match}%"))
-            elif self.criteria['search_text'] == "text":
-                where_clause += sql.SQL(f" AND (text {match_operator} {{}} OR text_prep {match_operator} {{}})").format(
-                    sql.Literal(f"%{string_match}%"),
-                    sql.Literal(f"%{string_match}%")
-                )
+        if self.criteria['string_match'] and self.criteria['string_match_mode'] == "fulltext":
+            where_clause += self.add_fulltext_query()
+        elif self.criteria['string_match']:
+            where_clause += self.add_string_match_query()
         if self.criteria['language']:
-            where_clause += sql.SQL(" AND language = {}").format(sql.Literal(self.criteria['language']))
+            where_clause += sql.SQL(" AND content.language = {}").format(sql.Literal(self.criteria['language']))
         if self.criteria['daterange']:
             start_date, end_date = self.criteria['daterange']
-            where_clause += sql.SQL(" AND date BETWEEN {} AND {}").format(sql.Literal(start_date), sql.Literal(end_date))
+            where_clause += sql.SQL(" AND content.date BETWEEN {} AND {}").format(sql.Literal(start_date), sql.Literal(end_date))
 
         where_clause = self.add_author_query(where_clause)
 
-        full_query = select_clause + sql.SQL(" ") + from_clause
-        if join_clauses:
-            full_query += sql.SQL(" ").join(join_clauses)
-
-        full_query += where_clause
-
-        return full_query
+        return where_clause
 
     def add_platform_and_label_query(self):
-        platform_table_mapping = {
-            "alt_news": {"table": "alt_news", "fields": ["url", "author"]},
-            "legacy_news": {"table": "legacy_news", "fields": ["meta", "terms", "author", "url", "section", "article_id"]},
-            "4chan": {"table": "fourchan", "fields": ["media_link", "author", "nreplies", "num", "doc_id", "op", "poster_country", "referencing_comment", "searchterm", "subnum", "thread_id", "comments"]},
-            "reddit": {"table": "reddit", "fields": ["author", "post_id", "link_id", "parent_id", "searchterm" ,"selftext", "terms", "type", "url"]},
-            "twitter": {"table": "twitter", "fields": ["tweet_id", "ref", "refid", "author_id", "sampled"]}
-        }
+        """
+        Build the join clauses and selected fields for platform-specific and label-specific information.
+        Every selected field gets an unambiguous alias; fields which several merged platform tables share
+        (e.g. author or url) are combined into one column using COALESCE, as each content row
+        matches at most one platform table.
 
-        label_table_mapping = {
-            "consp": {"table": "labels_consp", "fields": ["V1_bin", "V1_prob", "V2_GR_bin", "V2_GR_prob", "V2_NWO_bin", "V2_NWO_prob"]},
-            "liwc": {"table": "labels_liwc", "fields": ['bigwords', 'segment', 'wc', 'allnone', 'cause', 'certitude', 'cogproc', 
-                   'differ', 'discrep', 'emo_anger', 'emo_anx', 'emo_neg', 'emo_pos', 
-                   'emo_sad', 'emotion', 'insight', 'prep', 'tentat']}
-        }
+        Only columns selected with set_columns and set_exclude_text are included, and tables none of whose
+        fields are selected are not joined.
 
-        selected_fields = [sql.SQL("content.*")]
+        :return: Tuple of list of join clauses and list of selected fields
+        """
+        selected_fields = [sql.SQL("content.{}").format(sql.Identifier(column)) for column in CONTENT_COLUMNS if self.is_selected_column(column)]
         join_clauses = []
 
         if self.criteria['merge_platform_data']:
             if self.criteria['platform']:
+                field_sources = {}
                 for platform in self.criteria['platform']:
                     platform = platform.lower()
-                    if platform in platform_table_mapping:
-                        table_info = platform_table_mapping[platform]
+                    if platform in PLATFORM_TABLE_MAPPING:
+                        table_info = PLATFORM_TABLE_MAPPING[platform]
                         table_name = table_info["table"]
-                        fields = table_info["fields"]
-
-                        selected_fields.extend(
-                            [sql.SQL("{}.{}").format(sql.Identifier(table_name), sql.Identifier(field)) for field in fields]
-                        )
+                        fields = [field for field in table_info["fields"] if self.is_selected_column(field)]
+                        twitter_author = platform == 'twitter' and self.is_selected_column('author')
+                        if not fields and not twitter_author:
+                            continue
+
+                        for field in fields:
+                            field_sources.setdefault(field, []).append(
+                                sql.SQL("{}.{}").format(sql.Identifier(table_name), sql.Identifier(field))
+                            )
 
                         join_clauses.append(
-                            sql.SQL(" LEFT JOIN {} ON {}.id = content.id").format(
+                            sql.SQL(" LEFT JOIN {} ON {}.id = content.content_id AND content.platform = {}").format(
+                                sql.Identifier(table_name),
                                 sql.Identifier(table_name),
-                                sql.Identifier(table_name)
+                                sql.Literal(platform)
                             )
                         )
 
-                        if  self.criteria['platform']==None or 'twitter' in self.criteria['platform']:
+                        if twitter_author:
+                            field_sources.setdefault('author', []).append(sql.SQL("tu.username"))
                             join_clauses.append(
                                 sql.SQL(" LEFT JOIN twitter_user tu ON {}.author_id = tu.author_id").format(
                                     sql.Identifier(table_name)
                                 )
                             )
 
+                for field, sources in field_sources.items():
+                    if len(sources) == 1:
+                        source = sources[0]
+                    else:
+                        source = sql.SQL("COALESCE({})").format(sql.SQL(", ").join(sources))
+                    selected_fields.append(sql.SQL("{} AS {}").format(source, sql.Identifier(field)))
+
         if self.criteria['merge_label_data']:
             if self.criteria['label_inclusion']:
                 for label in self.criteria['label_inclusion']:
                     label = label.lower()
-                    if label in label_table_mapping:
-                        table_info = label_table_mapping[label]
+                    if label in LABEL_TABLE_MAPPING:
+                        table_info = LABEL_TABLE_MAPPING[label]
                         table_name = table_info["table"]
-                        fields = table_info["fields"]
+                        fields = [field for field in table_info["fields"] if self.is_selected_column(field)]
+                        if not fields:
+                            continue
 
                         selected_fields.extend(
-                            [sql.SQL("{}.{}").format(sql.Identifier(table_name), sql.Identifier(field)) for field in fields]
+                            [sql.SQL("{}.{} AS {}").format(sql.Identifier(table_name), sql.Identifier(field), sql.Identifier(field)) for field in fields]
                         )
 
                         join_clauses.append(
-                            sql.SQL(" LEFT JOIN {} ON {}.id = content.label_{}").format(
+                            sql.SQL(" LEFT JOIN {} ON {}.id = content.{}").format(
                                 sql.Identifier(table_name),
                                 sql.Identifier(table_name),
-                                sql.SQL(label)
+                                sql.Identifier(f"label_{label}")
                             )
                         )
 
         return join_clauses, selected_fields
     
+    def is_selected_column(self, column):
+        """
+        Check if a column is to be included in the query results (see set_columns and set_exclude_text).
+
+        :param column: Column name
+        :return: True if the column is selected
+        """
+        if self.criteria['columns'] and column not in self.criteria['columns']:
+            return False
+        if self.criteria['exclude_text'] and column in TEXT_COLUMNS:
+            return False
+        return True
+
+    def get_string_match_terms(self):
+        """
+        Return the search columns, match operator, terms and patterns of a substring or regex string match.
+
+        :return: Tuple of list of column names, match operator, list of terms and list of patterns
+        """
+        columns = {"all": ["text", "text_prep", "title"], "text": ["text", "text_prep"], "title": ["title"]}[self.criteria['search_text']]
+        terms = self.criteria['string_match']
+        if isinstance(terms, str):
+            terms = [terms]
+        if self.criteria['string_match_mode'] == "regex":
+            match_operator = "~" if self.criteria['case_sensitivity'] else "~*"
+            patterns = terms
+        else:
+            match_operator = "LIKE" if self.criteria['case_sensitivity'] else "ILIKE"
+            patterns = [f"%{term}%" for term in terms]
+        return columns, match_operator, terms, patterns
+
+    def add_string_match_query(self):
+        """
+        Build the substring or regex match condition over the trigram-indexed columns selected by search_text.
+        With "any" logic all terms are tested in one 'op ANY(array)' comparison per column, with "all" logic
+        every term has to match in at least one of the columns.
+
+        :return: SQL condition to append to the where clause
+        """
+        columns, match_operator, terms, patterns = self.get_string_match_terms()
+
+        def column_match(pattern):
+            return sql.SQL(" OR ").join(
+                sql.SQL("content.{} {} {}").format(sql.Identifier(column), sql.SQL(match_operator), pattern) for column in columns
+            )
+
+        if len(patterns) == 1:
+            condition = column_match(sql.Literal(patterns[0]))
+        elif self.criteria['string_match_logic'] == "any":
+            condition = column_match(sql.SQL("ANY({})").format(sql.Literal(patterns)))
+        else:
+            condition = sql.SQL(") AND (").join(column_match(sql.Literal(pattern)) for pattern in patterns)
+
+        return sql.SQL(" AND ((") + condition + sql.SQL("))")
+
+    def get_matched_terms_field(self):
+        """
+        Build the matched_terms field, which lists the terms of a multi-term string match found in each row.
+
+        :return: SQL expression of the matched_terms field
+        """
+        columns, match_operator, terms, patterns = self.get_string_match_terms()
+        return sql.SQL("ARRAY(SELECT t.term FROM unnest({}::text[], {}::text[]) AS t(term, pattern) WHERE {}) AS matched_terms").format(
+            sql.Literal(terms),
+            sql.Literal(patterns),
+            sql.SQL(" OR ").join(
+                sql.SQL("content.{} {} t.pattern").format(sql.Identifier(column), sql.SQL(match_operator)) for column in columns
+            )
+        )
+
+    def get_tsquery(self, language=None):
+        """
+        Build the tsquery of the full-text string match, parsed with the text search configuration of the given
+        language or, if no language is given, with the configuration of each post's language.
+
+        :param language: Language code, default is None
+        :return: SQL expression of the tsquery
+        """
+        if language:
+            config = sql.Literal(TEXT_SEARCH_CONFIGS[language])
+        else:
+            config = sql.SQL("CASE WHEN content.language = 'ger' THEN 'german' ELSE 'english' END")
+        search_string = self.criteria['string_match']
+        if isinstance(search_string, list):
+            terms = [f'"{term}"' if " " in term else term for term in search_string]
+            search_string = (" or " if self.criteria['string_match_logic'] == "any" else " ").join(terms)
+        return sql.SQL("websearch_to_tsquery({}::regconfig, {})").format(config, sql.Literal(search_string))
+
+    def add_fulltext_query(self):
+        """
+        Build the full-text search condition. Each language is matched with a constant tsquery, so that
+        the GIN index on content.text_tsv can be used. Title or text only searches recheck the matches
+        against the title (weight A) or text (weight B) part of the tsvector.
+
+        :return: SQL condition to append to the where clause
+        """
+        languages = [self.criteria['language']] if self.criteria['language'] else list(TEXT_SEARCH_CONFIGS)
+        weights = {"all": None, "title": "{a}", "text": "{b}"}[self.criteria['search_text']]
+
+        subconditions = []
+        for language in languages:
+            tsquery = self.get_tsquery(language)
+            subcondition = sql.SQL("(content.language = {} AND content.text_tsv @@ {}").format(sql.Literal(language), tsquery)
+            if weights:
+                subcondition += sql.SQL(" AND ts_filter(content.text_tsv, {}) @@ {}").format(sql.Literal(weights), tsquery)
+            subconditions.append(subcondition + sql.SQL(")"))
+
+        return sql.SQL(" AND (") + sql.SQL(" OR ").join(subconditions) + sql.SQL(")")
+
     def add_author_query(self, input_query):
+        """
+        Add the author condition to the query. Authors are resolved through the author_index table, which maps 
+        normalized (trimmed, lower case) author names of all platforms to the platform and content_id of their posts,
+        so that any number of authors is matched with one indexed semi-join.
+
+        :param input_query: SQL where clause
+        :return: SQL where clause including the author condition
+        """
         if self.criteria['author']:
-            author_name = self.criteria['author']
-            platform = self.criteria.get('platform', [])
-
-            author_condition = sql.SQL(" AND (")
-            subconditions = []
-
-            if platform==None or 'twitter' in platform:
-                subconditions.append(sql.SQL("""
-                    (platform = 'twitter' AND EXISTS (
-                        SELECT 1
-                        FROM twitter t
-                        JOIN twitter_user tu ON t.author_id = tu.author_id
-                        WHERE t.id = content.content_id AND tu.username = {}
-                    ))
-                """).format(sql.Literal(author_name)))
-
-            for p in ['alt_news', 'legacy_news', '4chan', 'reddit']:
-                if platform==None or p in platform:
-                    p_table = p if p!="4chan" else "fourchan"
-                    subconditions.append(sql.SQL("""
-                        (platform = {} AND EXISTS (
-                            SELECT 1
-                            FROM {} p
-                            WHERE p.id = content.content_id AND p.author = {}
-                        ))
-                    """).format(
-                        sql.Literal(p),
-                        sql.Identifier(p_table),
-                        sql.Literal(author_name)
-                    ))
-
-            if subconditions:
-                author_condition += sql.SQL(" OR ").join(subconditions)
-                author_condition += sql.SQL(")")
+            authors = self.criteria['author']
+            if isinstance(authors, str):
+                authors = [authors]
+
+            author_condition = sql.SQL("""
+                AND (content.platform, content.content_id) IN (
+                    SELECT ai.platform, ai.content_id
+                    FROM author_index ai
+                    WHERE ai.author_norm IN (SELECT lower(btrim(a)) FROM unnest({}::text[]) AS a)
+                )
+            """).format(sql.Literal(authors))
             query = input_query + author_condition
             return query
         else:
             return input_query
 
     def sum_rows(self, group_by=None):
+        """
+        Execute the query and return the count of rows, optionally grouped by the given columns. 
+        Counts which can be answered from the content_rollup table are read from there (see get_rollup_count).
+
+        :param group_by: Column name or list of column names, default is None
+        :return: Dataframe of counts
+        """
         if group_by:
             if isinstance(group_by, str):
                 group_by = [group_by]
-            
+
+        rollup = self.get_rollup_count(group_by or [])
+        if rollup is not None:
+            rollup_count, where_clause = rollup
+            if group_by:
+                group_by_fields = [
+                    sql.SQL("NULLIF(content.subplatform, '') AS subplatform") if column == "subplatform" else sql.SQL("content.{}").format(sql.Identifier(column))
+                    for column in group_by
+                ]
+                query = sql.SQL("SELECT {}, SUM({})::BIGINT AS count FROM content_rollup AS content").format(sql.SQL(', ').join(group_by_fields), rollup_count)
+                query += where_clause
+                query += sql.SQL(" GROUP BY {}").format(sql.SQL(', ').join(sql.SQL(str(i + 1)) for i in range(len(group_by))))
+            else:
+                query = sql.SQL("SELECT COALESCE(SUM({}), 0)::BIGINT AS count FROM content_rollup AS content").format(rollup_count)
+                query += where_clause
+            return self.query_db(query)
+
+        if group_by:
             group_by_clause = sql.SQL(', ').join(map(sql.Identifier, group_by))
             custom_select = sql.SQL("SELECT {}, COUNT(*)").format(group_by_clause)
             query = self.build_base_query(custom_select=custom_select)
@@ -443,24 +1634,325 @@ class NEOVEXQueryWrapper:
         return self.query_db(query)
 
 
+    def batch_counts(self, criteria_sets, group_by=None):
+        """
+        Count the rows matching each of several criteria sets in a single scan. Every criteria set (see set_criteria, 
+        e.g. {"string_match": "lizard"} or {"platform": "reddit", "language": "ger"}) overrides the criteria of the
+        wrapper and becomes one 'COUNT(*) FILTER (WHERE ...)' column; the scan itself is restricted by the criteria
+        which no set overrides.
+
+        :param criteria_sets: List of criteria dictionaries or dictionary of names and criteria dictionaries
+        :param group_by: Column name or list of column names, default is None
+        :return: Dataframe with the group_by columns, a criteria column (name or position of the criteria set) and a count column
+        """
+        if isinstance(criteria_sets, dict):
+            names = list(criteria_sets.keys())
+            criteria_sets = list(criteria_sets.values())
+        else:
+            names = list(range(len(criteria_sets)))
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        group_by = group_by or []
+        if not criteria_sets:
+            return pd.DataFrame(columns=group_by + ['criteria', 'count'])
+
+        string_match_keys = ['string_match', 'string_match_mode', 'string_match_logic', 'search_text', 'case_sensitivity']
+        filter_keys = ['label_inclusion', 'label_exclusion', 'platform', 'subplatform', 'string_match', 'language', 'daterange', 'author']
+        overridden_keys = set()
+        for criteria in criteria_sets:
+            overridden_keys.update('string_match' if key in string_match_keys else key for key in criteria)
+        scan_wrapper = self.copy(merge_platform_data=False, merge_label_data=False, **{key: None for key in filter_keys if key in overridden_keys})
+
+        count_fields = []
+        for i, criteria in enumerate(criteria_sets):
+            set_wrapper = self.copy(**criteria)
+            set_wrapper.check_query()
+            count_fields.append(sql.SQL("COUNT(*) FILTER ({}) AS {}").format(set_wrapper.build_where_clause(), sql.Identifier(f"count_{i}")))
+
+        group_by_fields = [sql.SQL("content.{}").format(sql.Identifier(column)) for column in group_by]
+        custom_select = sql.SQL("SELECT {}").format(sql.SQL(", ").join(group_by_fields + count_fields))
+        query = scan_wrapper.build_base_query(custom_select=custom_select)
+        if group_by:
+            query += sql.SQL(" GROUP BY {}").format(sql.SQL(", ").join(group_by_fields))
+
+        dat = self.query_db(sql_query=query)
+        counts = dat.melt(id_vars=group_by, var_name='criteria', value_name='count')
+        counts['criteria'] = counts['criteria'].map({f"count_{i}": name for i, name in enumerate(names)})
+        return counts
+
+    def label_stats(self, fields, group_by=None, stats=None, bins=10):
+        """
+        Compute statistics of LIWC and conspiracy label scores in the database and return only the aggregated result.
+        Posts matching the criteria are joined with the label tables of the requested fields; posts without these 
+        labels are left out. Boolean fields (e.g. v1_bin) are counted as 0/1, so their mean is the share of true labels.
+
+        :param fields: Label field name or list of label field names, e.g. ["emo_anger", "v1_prob"]
+        :param group_by: Content column name or list of content column names, default is None
+        :param stats: List of statistics out of "count", "mean", "std", "min", "max", "p<percent>" (e.g. "p90") 
+        and "hist", default is None (["mean", "std", "p50", "p90"])
+        :param bins: Number of equal-width histogram bins between the overall minimum and maximum of each field, default is 10
+        :return: Dataframe with the group_by columns and one <field>_<stat> column per field and statistic; histograms
+        are lists of bin counts, the bin edges are stored in the attrs of the result
+        """
+        if isinstance(fields, str):
+            fields = [fields]
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        group_by = group_by or []
+        if stats is None:
+            stats = ["mean", "std", "p50", "p90"]
+        self.check_query()
+
+        field_labels = {}
+        for field in fields:
+            labels = [label for label, table_info in LABEL_TABLE_MAPPING.items() if field in table_info["fields"]]
+            assert labels, f"Unknown label field '{field}'"
+            field_labels[field] = labels[0]
+
+        def field_expression(field):
+            expression = sql.SQL("{}.{}").format(sql.Identifier(LABEL_TABLE_MAPPING[field_labels[field]]["table"]), sql.Identifier(field))
+            return expression + sql.SQL("::int") if field.endswith("_bin") else expression
+
+        aggregates = {
+            "count": "COUNT({})",
+            "mean": "AVG({})",
+            "std": "STDDEV_SAMP({})",
+            "min": "MIN({})",
+            "max": "MAX({})"
+        }
+        scalar_stats = [stat for stat in stats if stat != "hist"]
+        if "hist" in stats:
+            scalar_stats += [stat for stat in ["min", "max"] if stat not in scalar_stats]
+
+        group_by_fields = [sql.SQL("content.{}").format(sql.Identifier(column)) for column in group_by]
+        stat_fields = []
+        for field in fields:
+            for stat in scalar_stats:
+                if stat in aggregates:
+                    aggregate = sql.SQL(aggregates[stat]).format(field_expression(field))
+                else:
+                    assert stat.startswith("p") and stat[1:].isdigit(), f"Unknown statistic '{stat}'"
+                    aggregate = sql.SQL("PERCENTILE_CONT({}) WITHIN GROUP (ORDER BY {})").format(sql.Literal(int(stat[1:]) / 100), field_expression(field))
+                stat_fields.append(sql.SQL("{} AS {}").format(aggregate, sql.Identifier(f"{field}_{stat}")))
+
+        from_clause = sql.SQL(" FROM content")
+        for label in dict.fromkeys(field_labels.values()):
+            from_clause += sql.SQL(" JOIN {} ON {}.id = content.{}").format(
+                sql.Identifier(LABEL_TABLE_MAPPING[label]["table"]),
+                sql.Identifier(LABEL_TABLE_MAPPING[label]["table"]),
+                sql.Identifier(f"label_{label}")
+            )
+        from_clause += self.build_where_clause()
+        group_by_clause = sql.SQL(" GROUP BY {}").format(sql.SQL(", ").join(group_by_fields)) if group_by else sql.SQL("")
+
+        query = sql.SQL("SELECT {}").format(sql.SQL(", ").join(group_by_fields + stat_fields)) + from_clause + group_by_clause
+        dat = self.query_db(sql_query=query)
+        if "hist" not in stats or dat.empty:
+            return dat
+
+        # histograms use the overall range of each field, so that bins are comparable between groups
+        hist_edges = {}
+        bucket_fields = []
+        for field in fields:
+            lower, upper = float(dat[f"{field}_min"].min()), float(dat[f"{field}_max"].max())
+            upper = upper if upper > lower else lower + 1
+            hist_edges[field] = np.linspace(lower, upper, bins + 1)
+            bucket_fields.append(sql.SQL("LEAST(WIDTH_BUCKET({}, {}, {}, {}), {})").format(
+                field_expression(field), sql.Literal(lower), sql.Literal(upper), sql.Literal(bins), sql.Literal(bins)
+            ))
+        bucket_query = sql.SQL("SELECT {}unnest({}::text[]) AS field, unnest(ARRAY[{}]) AS bucket").format(
+            sql.SQL("").join(group_by_field + sql.SQL(" AS ") + sql.Identifier(column) + sql.SQL(", ") for group_by_field, column in zip(group_by_fields, group_by)),
+            sql.Literal(fields),
+            sql.SQL(", ").join(bucket_fields)
+        ) + from_clause
+        group_columns = sql.SQL("").join(sql.Identifier(column) + sql.SQL(", ") for column in group_by)
+        hist_query = sql.SQL("SELECT {}field, bucket, COUNT(*) AS count FROM ({}) AS buckets WHERE bucket IS NOT NULL GROUP BY {}field, bucket").format(
+            group_columns, bucket_query, group_columns
+        )
+        hist_counts = self.query_db(sql_query=hist_query)
+
+        def to_histogram(counts):
+            return np.bincount(counts['bucket'].astype(int) - 1, weights=counts['count'], minlength=bins).astype(int).tolist()
+
+        for field in fields:
+            field_counts = hist_counts[hist_counts['field'] == field]
+            if group_by:
+                histograms = field_counts.groupby(group_by)[['bucket', 'count']].apply(to_histogram)
+                dat = dat.merge(histograms.rename(f"{field}_hist").reset_index(), on=group_by, how="left")
+            else:
+                dat[f"{field}_hist"] = [to_histogram(field_counts)]
+        dat.attrs['hist_edges'] = hist_edges
+        return dat
+
     def sum_per_time_unit(self, time_unit):
         """
         Execute the query and return the count of rows grouped by the specified time unit.
+        Counts which can be answered from the content_rollup table are read from there (see get_rollup_count).
 
         :param time_unit: Time unit for aggregation (e.g., 'MONTH', 'DAY')
         :return: List of tuples containing the time unit and count of rows
         """
-        custom_select = sql.SQL(f"SELECT {time_unit}(date), COUNT(*)")
-        query = self.build_base_query(custom_select=custom_select)
-        query += sql.SQL(" GROUP BY {}(date)").format(sql.Identifier(time_unit))
+        rollup = self.get_rollup_count(["date"])
+        if rollup is not None:
+            rollup_count, where_clause = rollup
+            query = sql.SQL(f"SELECT {time_unit}(content.date), SUM({{}})::BIGINT AS count FROM content_rollup AS content").format(rollup_count)
+            query += where_clause
+        else:
+            custom_select = sql.SQL(f"SELECT {time_unit}(date), COUNT(*)")
+            query = self.build_base_query(custom_select=custom_select)
+        query += sql.SQL(" GROUP BY 1")
         return self.query_db(query)
 
+    def set_use_rollup(self, use_rollup):
+        """
+        Set whether sum_rows and sum_per_time_unit may read counts from the content_rollup table while it is up to date
+        (see get_rollup_count). The default is True.
+
+        :param use_rollup: use_rollup setting
+        """
+        self.use_rollup = use_rollup
+
+    def get_rollup_count(self, group_by):
+        """
+        Check if a count can be answered from the content_rollup table, which holds post counts per date, platform,
+        subplatform and language. This is the case if the table exists, covers the latest change of the content table
+        (rollup_state.refreshed_at >= max(content.updated_at)) and no content was deleted since its last refresh (the
+        content_deletes counter is unchanged), the criteria only filter on these columns (plus at most one label
+        inclusion or exclusion) and the count is only grouped by them.
+
+        :param group_by: List of column names
+        :return: Tuple of SQL expression of the rollup column to sum and where clause or None if the rollup cannot be used
+        """
+        if not self.use_rollup:
+            return None
+        if self.criteria['string_match'] or self.criteria['author']:
+            return None
+        if not set(group_by) <= {"date", "platform", "subplatform", "language"}:
+            return None
+
+        label_inclusion = self.criteria['label_inclusion'] or []
+        label_exclusion = self.criteria['label_exclusion'] or []
+        if len(label_inclusion) + len(label_exclusion) > 1:
+            return None
+        if label_inclusion:
+            rollup_count = sql.SQL("content.{}").format(sql.Identifier(f"n_{label_inclusion[0]}"))
+        elif label_exclusion:
+            rollup_count = sql.SQL("content.n_posts - content.{}").format(sql.Identifier(f"n_{label_exclusion[0]}"))
+        else:
+            rollup_count = sql.SQL("content.n_posts")
+
+        # a rollup which was never refreshed or misses later imports or deletes would give wrong counts
+        def check_fresh(conn):
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                SELECT to_regclass('content_rollup') IS NOT NULL AND to_regclass('rollup_state') IS NOT NULL
+                    AND to_regclass('content_deletes') IS NOT NULL
+                """)
+                if not cursor.fetchone()[0]:
+                    return False
+                cursor.execute("""
+                SELECT COALESCE(
+                    (SELECT s.refreshed_at >= COALESCE((SELECT max(updated_at) FROM content), '-infinity')
+                        AND s.n_deletes = (SELECT n_deletes FROM content_deletes)
+                     FROM rollup_state s WHERE s.name = 'content_rollup'),
+                    false
+                )""")
+                return cursor.fetchone()[0]
+        if not self.pool.run(check_fresh):
+            return None
+
+        # label filters are answered by the rollup count instead of the where clause
+        where_clause = self.copy(label_inclusion=None, label_exclusion=None).build_where_clause()
+        return rollup_count, where_clause
+
+class AsyncNEOVEXQueryWrapper:
+    def __init__(self, *args, wrapper=None, **kwargs):
+        """
+        asyncio interface of the NEOVEXQueryWrapper. Criteria are set with the same set_ methods; the query methods
+        are coroutines which run on the shared connection pool, so independent queries overlap. Each call works on a
+        snapshot of the criteria taken when it is made.
+
+        :param args: Arguments of NEOVEXQueryWrapper
+        :param wrapper: Existing NEOVEXQueryWrapper to use instead of creating one, default is None
+        :param kwargs: Keyword arguments of NEOVEXQueryWrapper
+        """
+        self.wrapper = wrapper if wrapper is not None else NEOVEXQueryWrapper(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # setters, criteria and statistics are shared with the synchronous wrapper
+        return getattr(self.wrapper, name)
+
+    def copy(self, **criteria):
+        """
+        Return a copy of the wrapper with its own criteria, sharing the connection pool and result cache.
+
+        :param criteria: Criteria to change in the copy (see NEOVEXQueryWrapper.set_criteria)
+        :return: AsyncNEOVEXQueryWrapper instance
+        """
+        return AsyncNEOVEXQueryWrapper(wrapper=self.wrapper.copy(**criteria))
+
+    async def query_db(self, sql_query=None, str_query=None):
+        """
+        Execute a query and fetch all results (see NEOVEXQueryWrapper.query_db).
+
+        :return: Dataframe of query results
+        """
+        return await asyncio.to_thread(self.wrapper.copy().query_db, sql_query=sql_query, str_query=str_query)
+
+    async def execute_query(self):
+        """
+        Execute the constructed query and fetch all results (see NEOVEXQueryWrapper.execute_query).
+
+        :return: Dataframe of query results
+        """
+        return await asyncio.to_thread(self.wrapper.copy().execute_query)
+
+    async def sum_rows(self, group_by=None):
+        """
+        Count the rows matching the criteria (see NEOVEXQueryWrapper.sum_rows).
+
+        :return: Dataframe of counts
+        """
+        return await asyncio.to_thread(self.wrapper.copy().sum_rows, group_by=group_by)
+
+    async def sum_per_time_unit(self, time_unit):
+        """
+        Count the rows matching the criteria per time unit (see NEOVEXQueryWrapper.sum_per_time_unit).
+
+        :return: Dataframe of counts
+        """
+        return await asyncio.to_thread(self.wrapper.copy().sum_per_time_unit, time_unit)
+
+    async def export(self, path, format="parquet", chunk_bytes=64 * 2**20):
+        """
+        Export the results of the constructed query to a file (see NEOVEXQueryWrapper.export).
+        """
+        return await asyncio.to_thread(self.wrapper.copy().export, path, format=format, chunk_bytes=chunk_bytes)
+
+
+async def gather_queries(queries, limit=8):
+    """
+    Await several wrapper queries concurrently, running at most limit of them at the same time, e.g.
+    await gather_queries([wrapper.copy(platform=p).sum_rows() for p in platforms]).
+
+    :param queries: Iterable of coroutines of AsyncNEOVEXQueryWrapper methods
+    :param limit: Maximum number of concurrently running queries, default is 8
+    :return: List of query results in the order of the given queries
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run_query(query):
+        async with semaphore:
+            return await query
+
+    return await asyncio.gather(*(run_query(query) for query in queries))
+
 def get_config_dict(config_path='./.env'):
     """
     Read database config from config file and return information as python dict-
 
     :param config_path: Filepath of the .env file, default is './.env'
-    :return: python dictionary with keys HOST, UNAME, PW, DB_NAME, and BASE_PATH
+    :return: python dictionary with keys HOST, UNAME, PW, DB_NAME, POOL_MIN_SIZE, POOL_MAX_SIZE, CACHE_DIR, and CACHE_MAX_MB
     """
     config_dict = {}
     config = Config(RepositoryEnv(config_path))
@@ -468,6 +1960,10 @@ def get_config_dict(config_path='./.env'):
     config_dict['UNAME'] = config.get('UNAME')
     config_dict['PW'] = config.get('PASSWORD')
     config_dict['DB_NAME'] = config.get('DB_NAME')
+    config_dict['POOL_MIN_SIZE'] = config.get('POOL_MIN_SIZE', default=1, cast=int)
+    config_dict['POOL_MAX_SIZE'] = config.get('POOL_MAX_SIZE', default=8, cast=int)
+    config_dict['CACHE_DIR'] = config.get('CACHE_DIR', default=None)
+    config_dict['CACHE_MAX_MB'] = config.get('CACHE_MAX_MB', default=2048, cast=int)
     return config_dict
 
 def get_query_wrapper(label_inclusion=None, label_exclusion=None, platform=None, subplatform=None,
@@ -482,11 +1978,22 @@ def get_query_wrapper(label_inclusion=None, label_exclusion=None, platform=None,
     :param string_match: String to match
     :param language: Language code
     :param daterange: Tuple of (start_date, end_date)
-    :param author: Author name
+    :param author: Author name(s)
     :return: Initialized NEOVEXQueryWrapper instance
     """
     config_dict = get_config_dict()
+    cache = get_result_cache(config_dict['CACHE_DIR'], max_bytes=config_dict['CACHE_MAX_MB'] * 2**20) if config_dict['CACHE_DIR'] else None
     query_wapper = NEOVEXQueryWrapper(host=config_dict['HOST'], dbname=config_dict['DB_NAME'], user=config_dict['UNAME'], password=config_dict['PW'],
     label_inclusion=label_inclusion, label_exclusion=label_exclusion, platform=platform, subplatform=subplatform,
-    string_match=string_match, language=language, daterange=daterange, author=author)
-    return query_wapper
\ No newline at end of file
+    string_match=string_match, language=language, daterange=daterange, author=author,
+    pool_minconn=config_dict['POOL_MIN_SIZE'], pool_maxconn=config_dict['POOL_MAX_SIZE'], cache=cache)
+    return query_wapper
+
+def get_async_query_wrapper(**criteria):
+    """
+    Initialize the AsyncNEOVEXQueryWrapper with provided criteria (see get_query_wrapper) and return the instance.
+
+    :param criteria: Criteria passed to get_query_wrapper
+    :return: Initialized AsyncNEOVEXQueryWrapper instance
+    """
+    return AsyncNEOVEXQueryWrapper(wrapper=get_query_wrapper(**criteria))
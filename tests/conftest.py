@@ -0,0 +1,139 @@
+import os
+import sys
+import uuid
+import importlib
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), os.path.join(ROOT, "data_import")]
+
+# libpq connection string of a server on which the tests may create and drop a database,
+# e.g. "host=localhost user=postgres password=secret"; tests using the database are skipped without it
+TEST_DSN = os.environ.get("NEOVEX_TEST_DSN")
+
+TABLES = ["content", "alt_news", "legacy_news", "fourchan", "reddit", "twitter", "twitter_user",
+          "labels_consp", "labels_liwc", "author_index", "content_rollup", "rollup_state"]
+
+# 30 alt news, reddit and 4chan posts each, spread over 2021, with conspiracy labels for every second post
+POSTS_SQL = """
+INSERT INTO labels_consp (v1_bin, v1_prob, v2_gr_bin, v2_gr_prob, v2_nwo_bin, v2_nwo_prob)
+SELECT i % 4 = 0, i / 100.0, i % 6 = 0, i / 200.0, i % 8 = 0, i / 300.0 FROM generate_series(1, 45) i;
+INSERT INTO alt_news (url, author) SELECT 'https://alt.example/' || i, 'Author ' || i % 3 FROM generate_series(1, 30) i;
+INSERT INTO reddit (author, post_id, type, url, coded) SELECT 'redditor_' || i % 4, 'p' || i, 'RS', 'reddit.com/' || i, false FROM generate_series(1, 30) i;
+INSERT INTO fourchan (author, num, doc_id, thread_id) SELECT 'Anonymous', i, i, 1 FROM generate_series(1, 30) i;
+INSERT INTO content (date, timestamp, text, text_prep, title, platform, subplatform, language, content_id, label_consp)
+SELECT DATE '2021-01-01' + i * 12 + p, NULL, 'post ' || i || ' on ' || platform, 'post ' || i, 'title ' || i,
+    platform::platform_type, subplatform, 'eng', i, CASE WHEN i % 2 = 0 THEN p * 15 + i / 2 END
+FROM generate_series(1, 30) i,
+    (VALUES (0, 'alt_news', 'site'), (1, 'reddit', 'conspiracy'), (2, '4chan', 'pol')) AS platforms(p, platform, subplatform);
+"""
+
+
+@pytest.fixture
+def import_dir(tmp_path, monkeypatch):
+    """
+    Working directory of the import scripts, which read the .env file of the parent directory and log to ./logs.
+    """
+    (tmp_path / ".env").write_text(f"BASE_PATH={tmp_path}/data/\n")
+    run_dir = tmp_path / "run"
+    (run_dir / "logs").mkdir(parents=True)
+    monkeypatch.chdir(run_dir)
+    return run_dir
+
+
+@pytest.fixture
+def table_populate(import_dir):
+    return importlib.import_module("importing_scripts.table_populate")
+
+
+def create_database():
+    """
+    Create a new database with all NEOVEX tables on the server of NEOVEX_TEST_DSN and return its connection details.
+    """
+    import psycopg2 as pg
+    from psycopg2.extensions import parse_dsn
+    from importing_scripts.table_setup import create_tables
+
+    dbname = f"neovex_test_{uuid.uuid4().hex[:8]}"
+    admin = pg.connect(TEST_DSN)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f'CREATE DATABASE "{dbname}"')
+    admin.close()
+
+    conn_dat = {'host': 'localhost', 'port': '5432', 'password': ''}
+    conn_dat.update(parse_dsn(TEST_DSN))
+    conn_dat['dbname'] = dbname
+    connection = pg.connect(**conn_dat)
+    create_tables(connection.cursor(), connection)
+    connection.close()
+    return conn_dat
+
+
+def drop_database(conn_dat):
+    import psycopg2 as pg
+
+    admin = pg.connect(TEST_DSN)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE "{conn_dat["dbname"]}" WITH (FORCE)')
+    admin.close()
+
+
+@pytest.fixture(scope="session")
+def conn_dat():
+    """
+    Connection details of a new database with all NEOVEX tables, dropped after the test session.
+    """
+    if not TEST_DSN:
+        pytest.skip("NEOVEX_TEST_DSN is not set")
+    conn_dat = create_database()
+    yield conn_dat
+    drop_database(conn_dat)
+
+
+@pytest.fixture
+def own_conn_dat():
+    """
+    Connection details of a new database for a single test, e.g. one changing the table layout, dropped after the test.
+    """
+    if not TEST_DSN:
+        pytest.skip("NEOVEX_TEST_DSN is not set")
+    conn_dat = create_database()
+    yield conn_dat
+    drop_database(conn_dat)
+
+
+@pytest.fixture
+def db(conn_dat):
+    """
+    Connection and cursor to the test database, whose tables are emptied after each test.
+    """
+    import psycopg2 as pg
+
+    connection = pg.connect(**conn_dat)
+    cursor = connection.cursor()
+    yield connection, cursor
+    connection.rollback()
+    cursor.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE;")
+    connection.commit()
+    connection.close()
+
+
+@pytest.fixture
+def posts(db):
+    """
+    30 alt news, reddit and 4chan posts each, spread over 2021, with conspiracy labels for every second post.
+    """
+    connection, cursor = db
+    cursor.execute(POSTS_SQL)
+    connection.commit()
+    return connection, cursor
+
+
+@pytest.fixture
+def wrapper(conn_dat, posts):
+    from query_neovex import NEOVEXQueryWrapper
+
+    return NEOVEXQueryWrapper(conn_dat['dbname'], conn_dat['user'], conn_dat['password'], host=conn_dat['host'], port=conn_dat['port'])
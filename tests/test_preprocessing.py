@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from importing_scripts.preprocessing import preprocess_text, preprocess_text_parallel
+from benchmark_preprocess import legacy_preprocess_text, synthetic_frame
+
+TEXTS = [
+    "@user hello https://www.example.com/x world",
+    ">>12345 &gt;quoted www.example.org/a text",
+    "",
+    "  spaced @a_b  ",
+    "mail@me.com and @x",
+    "no links here",
+    "ünïcödé http://t.co/AbC123 end",
+    "http://a.de https://sub.example.co.uk/path?q=1#frag www.x.org"
+]
+
+
+def fixture_frame(platform, texts):
+    if platform == "twitter":
+        return pd.DataFrame({"text": texts})
+    if platform == "4chan":
+        return pd.DataFrame({"text.x": texts})
+    if platform == "legacy":
+        return pd.DataFrame({"textonly": texts, "Text": texts[::-1], "ArticleID": [1.0 if i % 2 else float("nan") for i in range(len(texts))]})
+    return pd.DataFrame({"type": ["RS" if i % 2 else "RC" for i in range(len(texts))], "selftext": texts, "body": texts[::-1]})
+
+
+@pytest.mark.parametrize("platform", ["twitter", "4chan", "legacy", "reddit"])
+def test_preprocess_text_matches_legacy(platform):
+    for df in [fixture_frame(platform, TEXTS), synthetic_frame(platform, 1000)]:
+        expected = legacy_preprocess_text(platform, df.copy())["text_prep"]
+        pd.testing.assert_series_equal(preprocess_text(platform, df.copy())["text_prep"], expected)
+
+
+@pytest.mark.parametrize("platform", ["4chan", "legacy", "reddit"])
+def test_preprocess_text_matches_legacy_with_missing_texts(platform):
+    df = fixture_frame(platform, TEXTS + [float("nan"), 12.5])
+    expected = legacy_preprocess_text(platform, df.copy())["text_prep"]
+    pd.testing.assert_series_equal(preprocess_text(platform, df.copy())["text_prep"], expected)
+
+
+def test_preprocess_tweets_with_missing_texts():
+    # the per-row implementation failed on the first non-string tweet and kept the raw text of the whole chunk,
+    # the vectorized one preprocesses all string tweets and leaves the others empty
+    df = fixture_frame("twitter", TEXTS + [float("nan")])
+    prepped = preprocess_text("twitter", df.copy())["text_prep"]
+    assert prepped.iloc[:-1].tolist() == legacy_preprocess_text("twitter", fixture_frame("twitter", TEXTS))["text_prep"].tolist()
+    assert pd.isna(prepped.iloc[-1])
+
+
+@pytest.mark.parametrize("platform", ["twitter", "4chan", "legacy", "reddit"])
+def test_parallel_preprocessing_matches_serial(platform):
+    df = synthetic_frame(platform, 5000)
+    expected = preprocess_text(platform, df.copy())["text_prep"]
+    pd.testing.assert_series_equal(preprocess_text_parallel(platform, df.copy(), workers=3)["text_prep"], expected)
@@ -0,0 +1,359 @@
+import pandas as pd
+import pytest
+
+from query_neovex import NEOVEXResultCache
+
+
+def test_result_cache_is_invalidated_by_deletes(wrapper, posts, tmp_path):
+    connection, cursor = posts
+    cache = NEOVEXResultCache(str(tmp_path / "cache"), watermark_ttl=0)
+    wrapper.set_cache(cache)
+    query = "SELECT count(*) AS n FROM content"
+
+    assert wrapper.query_db(str_query=query)['n'][0] == 90
+    assert wrapper.query_db(str_query=query)['n'][0] == 90
+    assert cache.get_stats()['hits'] == 1
+
+    # deleting the oldest post leaves max(updated_at) unchanged, the delete is counted by the content_deleted trigger
+    cursor.execute("DELETE FROM content WHERE id = (SELECT min(id) FROM content);")
+    connection.commit()
+    assert wrapper.query_db(str_query=query)['n'][0] == 89
+    assert cache.get_stats()['invalidations'] == 1
+
+
+def test_result_cache_only_holds_read_queries(wrapper, posts, tmp_path):
+    cache = NEOVEXResultCache(str(tmp_path / "cache"), watermark_ttl=3600)
+    wrapper.set_cache(cache)
+    update = "UPDATE content SET title = title || '!' WHERE id = 1"
+
+    wrapper.query_db(str_query=update)
+    wrapper.query_db(str_query=update)
+    assert cache.get_stats()['hits'] == 0
+    query = "WITH t AS (SELECT title FROM content WHERE id = 1) SELECT title FROM t"
+    assert wrapper.query_db(str_query=query)['title'][0] == "title 1!!"
+    assert wrapper.query_db(str_query=query)['title'][0] == "title 1!!"
+    assert cache.get_stats()['hits'] == 1
+
+
+def sorted_result(dat):
+    return dat.sort_values("id", ignore_index=True)
+
+
+@pytest.mark.parametrize("criteria", [
+    {},
+    {"merge_platform_data": True},
+    {"platform": ["alt_news", "reddit", "4chan"], "merge_platform_data": True},
+    {"platform": ["alt_news", "reddit"], "merge_platform_data": True, "merge_label_data": True, "label_inclusion": ["consp"]},
+    {"platform": ["alt_news", "reddit"], "merge_platform_data": True, "columns": ["id", "date", "author"]},
+    {"daterange": ("2021-03-01", "2021-10-31"), "platform": ["reddit", "4chan"], "merge_platform_data": True}
+])
+def test_parallel_query_equals_serial_query(wrapper, criteria):
+    wrapper.set_criteria(**criteria)
+    serial = wrapper.execute_query()
+    parallel = wrapper.execute_query(parallel=3)
+
+    assert list(parallel.columns) == list(serial.columns)
+    pd.testing.assert_frame_equal(sorted_result(parallel), sorted_result(serial), check_dtype=False)
+
+
+def read_export(path, format):
+    if format == "csv":
+        return pd.read_csv(path)
+    if format == "parquet":
+        return pd.read_parquet(path)
+    import pyarrow as pa
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow", "csv"])
+@pytest.mark.parametrize("parallel", [None, 3])
+def test_export_without_rows(wrapper, tmp_path, format, parallel):
+    wrapper.set_platform(["alt_news", "reddit"])
+    wrapper.set_string_match("no post contains this")
+    path = tmp_path / f"export.{format}"
+    wrapper.export(str(path), format=format, parallel=parallel)
+
+    dat = read_export(path, format)
+    assert len(dat) == 0
+    assert list(dat.columns) == list(wrapper.execute_query().columns)
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow", "csv"])
+def test_parallel_export_equals_serial_export(wrapper, tmp_path, format):
+    wrapper.set_criteria(platform=["alt_news", "reddit"], merge_platform_data=True, merge_label_data=True, label_inclusion=["consp"])
+    wrapper.export(str(tmp_path / f"serial.{format}"), format=format)
+    wrapper.export(str(tmp_path / f"parallel.{format}"), format=format, parallel=3)
+
+    serial = read_export(tmp_path / f"serial.{format}", format)
+    parallel = read_export(tmp_path / f"parallel.{format}", format)
+    assert len(serial) == 30
+    pd.testing.assert_frame_equal(sorted_result(parallel), sorted_result(serial))
+
+
+def test_sum_rows_ignores_stale_rollup(wrapper, posts):
+    from importing_scripts.table_setup import refresh_rollup_tables
+    connection, cursor = posts
+
+    # the rollup has not been refreshed since the posts were inserted
+    assert wrapper.get_rollup_count(["platform"]) is None
+    assert wrapper.sum_rows()['count'][0] == 90
+
+    refresh_rollup_tables(cursor, connection)
+    assert wrapper.get_rollup_count(["platform"]) is not None
+    assert wrapper.sum_rows()['count'][0] == 90
+
+    cursor.execute("""
+    INSERT INTO alt_news (url) VALUES ('https://alt.example/new');
+    INSERT INTO content (date, text, platform, language, content_id) SELECT '2021-06-01', 'new post', 'alt_news', 'eng', id FROM alt_news WHERE url = 'https://alt.example/new';
+    """)
+    connection.commit()
+    assert wrapper.get_rollup_count(["platform"]) is None
+    counts = wrapper.sum_rows(group_by="platform").set_index("platform")['count']
+    assert counts['alt_news'] == 31
+
+
+def test_sum_rows_ignores_rollup_after_deletes(wrapper, posts):
+    from importing_scripts.table_setup import refresh_rollup_tables
+    connection, cursor = posts
+
+    refresh_rollup_tables(cursor, connection)
+    assert wrapper.get_rollup_count(["platform"]) is not None
+
+    # deleting platform rows removes their posts through the delete_content_cascade trigger
+    cursor.execute("DELETE FROM reddit WHERE id <= 5;")
+    connection.commit()
+    assert wrapper.get_rollup_count(["platform"]) is None
+    assert wrapper.sum_rows(group_by="platform").set_index("platform")['count']['reddit'] == 25
+
+    # the next refresh is a full refresh which drops the deleted posts
+    refresh_rollup_tables(cursor, connection)
+    assert wrapper.get_rollup_count(["platform"]) is not None
+    assert wrapper.sum_rows(group_by="platform").set_index("platform")['count']['reddit'] == 25
+
+
+def test_author_index_is_backfilled(wrapper, posts):
+    from importing_scripts.table_setup import create_author_index_table
+    connection, cursor = posts
+
+    wrapper.set_author([" author 1", "REDDITOR_2"])
+    assert len(wrapper.execute_query()) == 0
+
+    # creating the index on a database with posts indexes their authors
+    create_author_index_table(cursor, connection)
+    counts = wrapper.sum_rows(group_by="platform").set_index("platform")['count']
+    assert counts.to_dict() == {"alt_news": 10, "reddit": 8}
+
+
+def test_explain_profiling_runs_queries_once(wrapper, posts):
+    connection, cursor = posts
+    cursor.execute("CREATE SEQUENCE IF NOT EXISTS profiling_runs;")
+    connection.commit()
+    wrapper.set_profiling(True, explain=True)
+
+    wrapper.query_db(str_query="SELECT nextval('profiling_runs') AS run")
+    wrapper.query_db(str_query="UPDATE content SET text_prep = text_prep WHERE id = 1 RETURNING id")
+    cursor.execute("SELECT last_value FROM profiling_runs;")
+    assert cursor.fetchone()[0] == 1
+
+    select_record, update_record = wrapper.get_query_profile().to_dict("records")
+    assert select_record['plan']['Node Type'] == "Result"
+    assert pd.isna(update_record.get('plan'))
+
+
+@pytest.mark.parametrize("method", ["system", "bernoulli"])
+def test_sample_of_small_table_holds_n_rows(wrapper, method):
+    for seed in range(10):
+        dat = wrapper.sample(n=5, seed=seed, method=method)
+        assert len(dat) == 5
+        assert dat.equals(wrapper.sample(n=5, seed=seed, method=method))
+
+
+def test_stratified_sample_of_small_table_holds_n_rows_per_stratum(wrapper, posts):
+    from importing_scripts.table_setup import refresh_rollup_tables
+    refresh_rollup_tables(posts[1], posts[0])
+
+    for seed in range(5):
+        dat = wrapper.sample(n=3, stratify_by="platform", seed=seed)
+        assert dat.groupby("platform").size().to_dict() == {"4chan": 3, "alt_news": 3, "reddit": 3}
+
+
+def test_batch_counts_without_criteria_sets(wrapper):
+    counts = wrapper.batch_counts([], group_by="platform")
+    assert counts.empty
+    assert list(counts.columns) == ["platform", "criteria", "count"]
+
+
+def test_wrappers_share_pools_of_the_same_size(conn_dat):
+    from query_neovex import get_connection_pool
+
+    pool = get_connection_pool(conn_dat, minconn=1, maxconn=4)
+    assert get_connection_pool(dict(conn_dat), minconn=1, maxconn=4) is pool
+    larger_pool = get_connection_pool(conn_dat, minconn=1, maxconn=6)
+    assert larger_pool is not pool
+    assert larger_pool.get_stats()['maxconn'] == 6
+
+
+def test_streamed_query_is_checked_before_the_first_chunk(wrapper):
+    wrapper.set_platform("myspace")
+    with pytest.raises(AssertionError):
+        wrapper.execute_query(stream=True)
+
+
+@pytest.mark.parametrize("search_text, expected", [("all", 30), ("text", 30), ("title", 0)])
+def test_string_match_searches_raw_text(wrapper, search_text, expected):
+    # only the raw text holds the platform, text_prep is 'post <i>'
+    wrapper.set_string_match("ON REDDIT")
+    wrapper.set_search_text(search_text)
+    assert wrapper.sum_rows()['count'][0] == expected
+
+
+def test_shared_platform_columns_are_merged(wrapper):
+    wrapper.set_criteria(platform=["alt_news", "reddit", "4chan"], merge_platform_data=True)
+    dat = wrapper.execute_query()
+
+    assert len(dat) == 90
+    assert list(dat.columns).count("author") == 1 and list(dat.columns).count("url") == 1
+    for row in dat.to_dict("records"):
+        i = row["content_id"]
+        if row["platform"] == "alt_news":
+            assert (row["author"], row["url"]) == (f"Author {i % 3}", f"https://alt.example/{i}")
+        elif row["platform"] == "reddit":
+            assert (row["author"], row["url"]) == (f"redditor_{i % 4}", f"reddit.com/{i}")
+        else:
+            assert row["author"] == "Anonymous" and pd.isna(row["url"])
+
+
+@pytest.mark.parametrize("string_match, options, expected", [
+    # 'post 1' and 'post 10' to 'post 19' on every platform
+    ("post 1", {}, 33),
+    (["post 2", "post 3"], {}, 39),
+    (["post 1", "on reddit"], {"match": "all"}, 11),
+    (r"^post [0-9]$", {"mode": "regex"}, 27),
+    ([r"^title 3\d$", r"^post 1$"], {"mode": "regex"}, 6),
+    ("POST 1", {}, 33)
+])
+def test_string_match(wrapper, string_match, options, expected):
+    wrapper.set_string_match(string_match, **options)
+    assert len(wrapper.execute_query()) == expected
+
+
+def test_string_match_is_case_sensitive_if_set(wrapper):
+    wrapper.set_string_match("POST 1")
+    wrapper.set_case_sensitivity(True)
+    assert len(wrapper.execute_query()) == 0
+    wrapper.set_string_match(["Post", "title 5"])
+    assert len(wrapper.execute_query()) == 3
+
+
+def test_string_match_lists_matched_terms(wrapper):
+    wrapper.set_string_match(["on reddit", "title 5"])
+    dat = wrapper.execute_query().set_index(["platform", "content_id"])
+
+    assert len(dat) == 32
+    assert list(dat.loc[("reddit", 5), "matched_terms"]) == ["on reddit", "title 5"]
+    assert list(dat.loc[("reddit", 6), "matched_terms"]) == ["on reddit"]
+    assert list(dat.loc[("4chan", 5), "matched_terms"]) == ["title 5"]
+
+
+@pytest.mark.parametrize("string_match, expected", [
+    ("title", 90),
+    ("13", 3),
+    ('"post 13" or "post 14"', 6),
+    ("post -13", 87),
+    (["13", "14"], 6)
+])
+def test_fulltext_match(wrapper, string_match, expected):
+    wrapper.set_string_match(string_match, mode="fulltext")
+    dat = wrapper.execute_query()
+    assert len(dat) == expected
+    assert dat["rank"].is_monotonic_decreasing
+
+
+def test_fulltext_match_ranks_title_matches_first(wrapper):
+    # every post has 'post' in its text and 'title' in its title, title words have the higher weight
+    wrapper.set_string_match("post or title 7", mode="fulltext")
+    dat = wrapper.execute_query()
+    assert len(dat) == 90
+    assert set(dat["content_id"].iloc[:3]) == {7}
+
+
+@pytest.mark.parametrize("size", [7, 6])
+def test_pages_hold_every_row_once(wrapper, posts, size):
+    connection, cursor = posts
+    # posts sharing a date are ordered by id
+    cursor.execute("UPDATE content SET date = DATE '2021-06-01' WHERE id % 3 = 0;")
+    connection.commit()
+    wrapper.set_platform(["reddit", "4chan"])
+
+    pages = []
+    token = None
+    while True:
+        dat, token = wrapper.page(after=token, size=size)
+        assert len(dat) <= size
+        pages.append(dat)
+        if token is None:
+            break
+
+    rows = pd.concat([dat for dat in pages if len(dat)], ignore_index=True)
+    expected = wrapper.execute_query().sort_values(["date", "id"], ignore_index=True)
+    assert len(rows) == 60
+    assert rows["id"].tolist() == expected["id"].tolist()
+
+
+def test_label_stats_match_raw_labels(wrapper, posts):
+    connection, cursor = posts
+    cursor.execute("""
+    SELECT c.platform::text AS platform, l.v1_bin::int AS v1_bin, l.v1_prob::float AS v1_prob
+    FROM content c JOIN labels_consp l ON l.id = c.label_consp;
+    """)
+    labels = pd.DataFrame(cursor.fetchall(), columns=["platform", "v1_bin", "v1_prob"])
+    expected = labels.groupby("platform").agg(v1_bin_mean=("v1_bin", "mean"), v1_prob_count=("v1_prob", "count"), v1_prob_max=("v1_prob", "max"))
+
+    stats = wrapper.label_stats(["v1_bin", "v1_prob"], group_by="platform", stats=["mean", "count", "max"])
+    stats = stats.astype({"platform": str}).set_index("platform").sort_index()
+    for column in expected.columns:
+        assert stats[column].astype(float).tolist() == pytest.approx(expected[column].astype(float).tolist())
+
+
+def test_pool_replaces_connections_closed_by_the_server(conn_dat):
+    import psycopg2 as pg
+    from query_neovex import NEOVEXConnectionPool
+
+    def backend_pid(conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            return cursor.fetchone()[0]
+
+    pool = NEOVEXConnectionPool(conn_dat, maxconn=1, health_check_interval=0)
+    pid = pool.run(backend_pid)
+    admin = pg.connect(**conn_dat)
+    with admin.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s, 5000)", (pid,))
+    admin.close()
+
+    # the health check on checkout finds the closed connection and opens a new one
+    assert pool.run(backend_pid) != pid
+    stats = pool.get_stats()
+    assert stats['reconnects'] == 1 and stats['health_checks'] >= 1 and stats['in_use'] == 0
+    pool.close()
+
+
+def test_pool_repeats_calls_which_lost_their_connection(conn_dat):
+    from query_neovex import NEOVEXConnectionPool
+
+    calls = []
+
+    def query(conn):
+        calls.append(conn)
+        with conn.cursor() as cursor:
+            if len(calls) == 1:
+                cursor.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+            cursor.execute("SELECT 42")
+            return cursor.fetchone()[0]
+
+    pool = NEOVEXConnectionPool(conn_dat, maxconn=1, health_check_interval=3600)
+    assert pool.run(query) == 42
+    assert len(calls) == 2 and calls[0].closed
+    assert pool.get_stats()['reconnects'] == 1
+    pool.close()
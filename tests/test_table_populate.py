@@ -0,0 +1,72 @@
+import json
+
+import pandas as pd
+import pytest
+
+
+def read_rejects(logname):
+    with open(f"./logs/{logname}_rejects.jsonl") as reject_file:
+        return [json.loads(line) for line in reject_file]
+
+
+def altnews_posts(dates):
+    chunk = pd.DataFrame({
+        "url": [f"https://example.org/{i}" for i in range(len(dates))],
+        "author": [f"author {i}" for i in range(len(dates))],
+        "date": dates,
+        "text": [f"text {i}" for i in range(len(dates))]
+    })
+    posts = [{
+        'platform': (row['url'], row['author']),
+        'content': (row['date'], None, row['text'], None, row['text'], 'alt_news', 'test', 'eng'),
+        'row': position
+    } for position, row in enumerate(chunk.to_dict('records'))]
+    return posts, chunk
+
+
+def test_convert_rows_rejects_failing_rows(table_populate):
+    df = pd.DataFrame({"created_utc": [1600000000, "not a number", 1600000060]})
+    remaining, converted = table_populate.convert_rows(df, "created_utc", lambda value: int(value) * 2, "reddit")
+
+    assert remaining["created_utc"].tolist() == [1600000000, 1600000060]
+    assert converted == [3200000000, 3200000120]
+    rejects = read_rejects("reddit")
+    assert len(rejects) == 1
+    assert rejects[0]["row"] == {"created_utc": "not a number"}
+
+
+def test_load_posts_isolates_rejected_posts(table_populate, db):
+    connection, cursor = db
+    posts, chunk = altnews_posts(["2021-03-01", "2021-03-02", "not a date", "2021-03-04", "2021-03-05"])
+
+    table_populate.load_posts(cursor, connection, "alt_news", ["url", "author"], posts, chunk, "alt_news", labels=())
+
+    cursor.execute("SELECT a.url FROM content c JOIN alt_news a ON a.id = c.content_id ORDER BY c.date;")
+    assert [row[0] for row in cursor.fetchall()] == [url for url in chunk["url"] if url != "https://example.org/2"]
+    cursor.execute("SELECT count(*) FROM alt_news;")
+    assert cursor.fetchone()[0] == 4
+    rejects = read_rejects("alt_news")
+    assert len(rejects) == 1
+    assert rejects[0]["row"]["date"] == "not a date"
+
+
+def test_load_posts_does_not_reject_posts_on_other_errors(table_populate, db):
+    connection, cursor = db
+    posts, chunk = altnews_posts(["2021-03-01", "2021-03-02"])
+
+    # an unknown table is an error of the import, not of the posts: the chunk is logged as failed and nothing is rejected
+    table_populate.load_posts(cursor, connection, "missing_table", ["url", "author"], posts, chunk, "alt_news", labels=())
+
+    cursor.execute("SELECT count(*) FROM content;")
+    assert cursor.fetchone()[0] == 0
+    with open("./logs/alt_news.log") as log_file:
+        assert "Chunk insertion error" in log_file.read()
+    with pytest.raises(FileNotFoundError):
+        read_rejects("alt_news")
+
+
+def test_load_posts_without_posts(table_populate, db):
+    connection, cursor = db
+    table_populate.load_posts(cursor, connection, "alt_news", ["url", "author"], [], pd.DataFrame(), "alt_news")
+    cursor.execute("SELECT count(*) FROM alt_news;")
+    assert cursor.fetchone()[0] == 0
@@ -0,0 +1,78 @@
+import psycopg2 as pg
+import pytest
+
+from conftest import POSTS_SQL
+from importing_scripts.table_setup import (SECONDARY_INDEXES, create_indexes, drop_indexes, index_usage_report, is_partitioned,
+                                           migrate_content_to_partitioned, purge_content_partition, refresh_rollup_tables)
+
+
+def existing_indexes(cursor):
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema();")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def test_secondary_indexes_are_dropped_and_rebuilt(db):
+    connection, cursor = db
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm');")
+    has_trigrams = cursor.fetchone()[0]
+    expected = {name for name, (table, definition) in SECONDARY_INDEXES.items() if has_trigrams or "gin_trgm_ops" not in definition}
+
+    try:
+        drop_indexes(cursor, connection)
+        assert not existing_indexes(cursor) & set(SECONDARY_INDEXES)
+    finally:
+        create_indexes(cursor, connection)
+    assert existing_indexes(cursor) & set(SECONDARY_INDEXES) == expected
+    assert expected <= {row[1] for row in index_usage_report(cursor)}
+
+
+def count_by_platform(cursor, table="content"):
+    cursor.execute(f"SELECT platform::text, count(*) FROM {table} GROUP BY 1;")
+    return dict(cursor.fetchall())
+
+
+def test_partitioned_content_is_purged_by_platform_and_year(own_conn_dat):
+    connection = pg.connect(**own_conn_dat)
+    cursor = connection.cursor()
+    cursor.execute(POSTS_SQL)
+    connection.commit()
+    refresh_rollup_tables(cursor, connection)
+
+    migrate_content_to_partitioned(cursor, connection)
+    assert is_partitioned(cursor, "content")
+    assert count_by_platform(cursor) == {"alt_news": 30, "reddit": 30, "4chan": 30}
+    assert count_by_platform(cursor, "content_reddit_2021") == {"reddit": 30}
+
+    purge_content_partition(cursor, connection, "reddit", 2021)
+    assert count_by_platform(cursor) == {"alt_news": 30, "4chan": 30}
+    cursor.execute("SELECT (SELECT count(*) FROM reddit), (SELECT count(*) FROM labels_consp);")
+    assert cursor.fetchone() == (0, 30)
+    # the purge is counted as a content delete, the rollup kept up to date is marked as such
+    cursor.execute("SELECT d.n_deletes, s.n_deletes FROM content_deletes d, rollup_state s WHERE s.name = 'content_rollup';")
+    n_deletes, rollup_deletes = cursor.fetchone()
+    assert n_deletes > 0 and rollup_deletes == n_deletes
+    # the cascade trigger which was disabled during the purge works again
+    cursor.execute("SELECT tgenabled FROM pg_trigger WHERE tgname = 'delete_reddit_content';")
+    assert cursor.fetchone()[0] == "O"
+    assert count_by_platform(cursor, "content_rollup") == {"alt_news": 30, "4chan": 30}
+    connection.close()
+
+
+def test_purged_partition_keeps_the_rollup_up_to_date(own_conn_dat):
+    from query_neovex import NEOVEXQueryWrapper
+
+    connection = pg.connect(**own_conn_dat)
+    cursor = connection.cursor()
+    cursor.execute(POSTS_SQL)
+    connection.commit()
+    migrate_content_to_partitioned(cursor, connection)
+    refresh_rollup_tables(cursor, connection)
+    purge_content_partition(cursor, connection, "4chan")
+    connection.close()
+
+    wrapper = NEOVEXQueryWrapper(own_conn_dat['dbname'], own_conn_dat['user'], own_conn_dat['password'],
+                                 host=own_conn_dat['host'], port=own_conn_dat['port'])
+    assert wrapper.get_rollup_count(["platform"]) is not None
+    counts = wrapper.sum_rows(group_by="platform").astype({"platform": str}).set_index("platform")['count']
+    assert counts.to_dict() == {"alt_news": 30, "reddit": 30}
+    wrapper.pool.close()